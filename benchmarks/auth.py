@@ -0,0 +1,57 @@
+"""
+Бенчмарк вартості авторизації одного запиту (auth_service.get_current_user, мкс/запит):
+без кешів (jwt.decode + запит користувача до БД), з кешем користувача (jwt.decode на кожен запит)
+та з кешем перевірених токенів.
+
+python -m benchmarks.auth --requests 2000
+"""
+import argparse
+import asyncio
+
+from benchmarks import seed  # first: it points the config at the benchmark database
+
+from src.database import db_connect
+from src.services.auth import auth_service
+from src.services.cache import token_cache, user_cache
+
+
+async def authenticate(token: str, db: db_connect.DBSession, requests: int, *caches) -> None:
+    """`requests` calls of get_current_user, the given caches are emptied before each of them."""
+    for _ in range(requests):
+        for cache in caches:
+            cache.clear()
+        await auth_service.get_current_user(token, db)
+
+
+async def main(requests: int, repeat: int) -> None:
+    seed.seed(0)
+    user = seed.user()
+    token = await auth_service.create_access_token(data={'sub': user.email}, expires_delta=3600)
+    driver = db_connect.init_engine().url.drivername
+    db = db_connect.SessionLocal()
+    paths = (
+             ('no caches: jwt.decode + user query', (token_cache, user_cache)),
+             ('user cache: jwt.decode', (token_cache,)),
+             ('user cache + token cache', ()),
+             )
+    rows = []
+    try:
+        await auth_service.get_current_user(token, db)
+        for name, caches in paths:
+            seconds = await seed.timed(lambda: authenticate(token, db, requests, *caches), repeat)
+            rows.append((name, f'{seconds / requests * 1e6:.1f}'))
+
+    finally:
+        await db_connect.close(db)
+        await db_connect.dispose_engine()
+
+    print(f'{requests} requests ({driver})')
+    print(seed.table(rows, ('path', 'us/request')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.requests, arguments.repeat))
@@ -0,0 +1,105 @@
+"""
+Навантажувальний тест лаунчера (python -m src.launcher): запити/с та затримка (p50/p99, мс) на
+GET /api/contacts/ залежно від кількості воркерів. Клієнти - окремі процеси (кожен з --concurrency
+потоками та keep-alive з'єднаннями), щоб генератор навантаження не впирався в один GIL.
+
+python -m benchmarks.load --workers 1 2 4 --clients 4 --concurrency 8 --duration 10
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import seed  # first: it points the config at the benchmark database
+import httpx
+
+from src.database.db_connect import database_url
+from src.services.auth import auth_service
+
+
+URL = '/api/contacts/?size=20&count=exact'
+
+
+def requests_for(base_url: str, headers: dict, duration: float) -> list[float]:
+    """Latencies (s) of the requests one connection sent within `duration` seconds."""
+    latencies = []
+    with httpx.Client(base_url=base_url, headers=headers) as client:
+        deadline = time.perf_counter() + duration
+        while (start := time.perf_counter()) < deadline:
+            response = client.get(URL)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def client_process(base_url: str, headers: dict, concurrency: int, duration: float) -> list[float]:
+    with ThreadPoolExecutor(concurrency) as threads:
+        results = threads.map(lambda _: requests_for(base_url, headers, duration), range(concurrency))
+        return [latency for latencies in results for latency in latencies]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """The launcher with `workers` workers on the benchmark database, returned once it answers."""
+    env = dict(os.environ, SERVER_WORKERS=str(workers), SERVER_PORT=str(port), SERVER_MAX_REQUESTS='0',
+               LOGGING_LEVEL='WARNING')
+    server = subprocess.Popen([sys.executable, '-m', 'src.launcher'], env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/health/live').status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError(f'The launcher did not start on port {port}')
+
+
+def load(workers: int, port: int, headers: dict, clients: int, concurrency: int, duration: float) -> list:
+    server = start_server(workers, port)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        client_process(base_url, headers, 1, 1)  # warm up: connections, caches
+        with ProcessPoolExecutor(clients) as processes:
+            results = processes.map(client_process, *zip(*[(base_url, headers, concurrency, duration)] * clients))
+            latencies = sorted(latency for result in results for latency in result)
+
+    finally:
+        server.terminate()
+        server.wait()
+
+    return [
+            workers,
+            len(latencies),
+            f'{len(latencies) / duration:.0f}',
+            f'{latencies[len(latencies) // 2] * 1000:.1f}',
+            f'{latencies[int(len(latencies) * 0.99)] * 1000:.1f}',
+            ]
+
+
+def main(workers: list[int], contacts: int, clients: int, concurrency: int, duration: float, port: int) -> None:
+    seed.seed(contacts)
+    token = asyncio.run(auth_service.create_access_token(data={'sub': seed.EMAIL}, expires_delta=3600))
+    headers = {'Authorization': f'Bearer {token}'}
+    rows = [load(count, port, headers, clients, concurrency, duration) for count in workers]
+
+    print(f'GET {URL}, {clients} x {concurrency} connections for {duration} s, {os.cpu_count()} cores '
+          f'({database_url().split(":")[0]})')
+    print(seed.table(rows, ('workers', 'requests', 'req/s', 'p50 ms', 'p99 ms')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--contacts', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8101)
+    arguments = parser.parse_args()
+    main(arguments.workers, arguments.contacts, arguments.clients, arguments.concurrency, arguments.duration,
+         arguments.port)
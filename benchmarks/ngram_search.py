@@ -0,0 +1,68 @@
+"""
+Бенчмарк пошуку за частковим збігом (GET /api/contacts/search_by_like_fields_or/{query}, мс/запит)
+залежно від кількості контактів: лише SQL (ILIKE; на PostgreSQL - pg_trgm індекси) та, на sqlite,
+з in-process n-gram індексом - вже побудованим і побудованим заново (перший пошук після запису).
+
+python -m benchmarks.ngram_search --contacts 1000 10000 40000
+"""
+import argparse
+import asyncio
+
+from benchmarks import seed  # first: it points the config at the benchmark database
+from fastapi.testclient import TestClient
+
+from main import app
+from src.database.db_connect import database_url
+from src.repository import contacts as repository_contacts
+from src.services.auth import auth_service
+from src.services.ngram import ngram_indexes
+
+
+# selective: one contact (Name000123), broad: every contact (the e-mails), digits: a phone part
+QUERIES = ('Name000123', 'example', '0000123')
+
+
+def search(client: TestClient, headers: dict, query: str, repeat: int, rebuild: bool = False) -> tuple[float, int]:
+    """Best latency (ms) of the search and its number of matches; rebuild - without a built n-gram index."""
+    async def request() -> None:
+        nonlocal total
+        if rebuild:
+            ngram_indexes.clear()
+        response = client.get(f'/api/contacts/search_by_like_fields_or/{query}', headers=headers,
+                              params={'count': 'exact', 'size': 50})
+        total = response.json()['total']
+
+    total = 0
+    seconds = asyncio.run(seed.timed(request, repeat))
+
+    return seconds * 1000, total
+
+
+def main(sizes: list[int], repeat: int) -> None:
+    rows = []
+    for contacts in sizes:
+        seed.seed(contacts)
+        token = asyncio.run(auth_service.create_access_token(data={'sub': seed.EMAIL}, expires_delta=3600))
+        headers = {'Authorization': f'Bearer {token}'}
+        with TestClient(app) as client:
+            for query in QUERIES:
+                repository_contacts.NGRAM_INDEX = False
+                sql, matches = search(client, headers, query, repeat)
+                row = [contacts, query, matches, f'{sql:.1f}', '-', '-']
+                if database_url().startswith('sqlite'):
+                    repository_contacts.NGRAM_INDEX = True
+                    row[5] = f'{search(client, headers, query, repeat, rebuild=True)[0]:.1f}'
+                    row[4] = f'{search(client, headers, query, repeat)[0]:.1f}'
+                rows.append(row)
+        ngram_indexes.clear()
+
+    print(f'ms per search, best of {repeat} ({database_url().split(":")[0]})')
+    print(seed.table(rows, ('contacts', 'query', 'matches', 'SQL only', 'n-gram index', 'index rebuild')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, nargs='+', default=[1000, 10000, 40000])
+    parser.add_argument('--repeat', type=int, default=5)
+    arguments = parser.parse_args()
+    main(arguments.contacts, arguments.repeat)
@@ -0,0 +1,92 @@
+"""
+Бенчмарк шляху читання списків контактів (рядків/с на сторінках по --size):
+ORM-об'єкти + pydantic (Page[ContactResponse]) + jsonable_encoder/json - як було до швидкого шляху,
+проти кортежів колонок у ContactRecord + orjson (paginate(record=...), ORJSONResponse).
+
+python -m benchmarks.read_path --contacts 10000 --size 100 --pages 20
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks import seed  # first: it points the config at the benchmark database
+from fastapi.encoders import jsonable_encoder
+from fastapi_pagination import Params
+from fastapi_pagination.api import set_page
+import orjson
+from sqlalchemy import select
+
+from src.database import db_connect
+from src.database.models import Contact
+from src.database.pagination import Page, paginate
+from src.repository.contacts import CONTACT_FIELDS, CONTACTS_ORDER, contact_record, DEFAULT_LIST_FIELDS
+from src.schemes import ContactResponse
+
+
+async def orm_pages(db: db_connect.DBSession, user_id: int, size: int, pages: int) -> int:
+    """Full ORM objects validated into the response model and encoded by the standard json module."""
+    body = b''
+    for page in range(1, pages + 1):
+        with set_page(Page[ContactResponse]):
+            result = await paginate(
+                                    db,
+                                    select(Contact).filter(Contact.user_id == user_id),
+                                    CONTACTS_ORDER,
+                                    params=Params(page=page, size=size)
+                                    )
+        body = json.dumps(jsonable_encoder(result)).encode()
+        db.expunge_all()
+
+    return len(body)
+
+
+async def record_pages(db: db_connect.DBSession, user_id: int, size: int, pages: int, fields: tuple) -> int:
+    """Column tuples mapped into slots records, the page dict encoded by orjson."""
+    body = b''
+    record = contact_record(fields)
+    columns = [getattr(Contact, field) for field in fields]
+    for page in range(1, pages + 1):
+        result = await paginate(
+                                db,
+                                select(*columns).filter(Contact.user_id == user_id),
+                                CONTACTS_ORDER,
+                                params=Params(page=page, size=size),
+                                record=record
+                                )
+        body = orjson.dumps(result)
+
+    return len(body)
+
+
+async def main(contacts: int, size: int, pages: int, repeat: int) -> None:
+    seed.seed(contacts)
+    user = seed.user()
+    driver = db_connect.init_engine().url.drivername
+    db = db_connect.SessionLocal()
+    paths = (
+             ('ORM + pydantic + json', lambda: orm_pages(db, user.id, size, pages)),
+             ('records + orjson, all fields', lambda: record_pages(db, user.id, size, pages, CONTACT_FIELDS)),
+             ('records + orjson, default fields', lambda: record_pages(db, user.id, size, pages, DEFAULT_LIST_FIELDS)),
+             )
+    rows = []
+    try:
+        for name, run in paths:
+            seconds = await seed.timed(run, repeat)
+            rows.append((name, f'{seconds / pages * 1000:.2f}', f'{size * pages / seconds:,.0f}'))
+
+    finally:
+        await db_connect.close(db)
+        await db_connect.dispose_engine()
+
+    print(f'{contacts} contacts, {pages} pages of {size} ({driver})')
+    print(seed.table(rows, ('path', 'ms/page', 'rows/s')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.contacts, arguments.size, arguments.pages, arguments.repeat))
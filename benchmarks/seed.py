@@ -0,0 +1,87 @@
+"""
+Спільне для бенчмарків: тимчасова sqlite база (або налаштована PostgreSQL) з N контактами одного користувача.
+
+Бенчмарки запускаються з кореня репозиторію: python -m benchmarks.<name> --help
+Без змінних оточення база - тимчасовий sqlite файл; DB_DEV_SQLITE_FILE= (порожнє значення) - база з config.ini.
+"""
+from datetime import date, timedelta
+import os
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+if 'DB_DEV_SQLITE_FILE' not in os.environ:
+    os.environ['DB_DEV_SQLITE_FILE'] = os.path.join(tempfile.mkdtemp(prefix='bench'), 'bench.db')
+
+from sqlalchemy import create_engine, delete
+
+from src.database.db_connect import Base, database_url
+from src.database.models import Contact, User
+from src.repository.contacts import derived_values
+
+
+EMAIL = 'bench@example.com'
+
+
+def contact_values(number: int) -> dict:
+    """Distinct (per-user unique) values of the contact number."""
+    return derived_values({
+                           'name': f'Name{number:06d}',
+                           'last_name': f'Last{number % 997:03d}',
+                           'email': f'c{number}@example.com',
+                           'phone': 5000000000 + number,
+                           'birthday': date(1990, 1, 1) + timedelta(days=number % 3650),
+                           'description': 'x' * 200,
+                           })
+
+
+def seed(contacts: int, batch_size: int = 5000) -> None:
+    """Tables (create_all) and the benchmark user with `contacts` contacts, the old ones are replaced."""
+    engine = create_engine(database_url())
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        user_id = connection.execute(User.__table__.select().filter(User.email == EMAIL)).scalar()
+        if user_id is None:
+            user_id = connection.execute(
+                                         User.__table__.insert()
+                                         .values(username='bench', email=EMAIL, password='-')
+                                         .returning(User.id)
+                                         ).scalar()
+        connection.execute(delete(Contact).where(Contact.user_id == user_id))
+        for start in range(0, contacts, batch_size):
+            connection.execute(
+                               Contact.__table__.insert(),
+                               [
+                                dict(contact_values(number), user_id=user_id)
+                                for number in range(start, min(start + batch_size, contacts))
+                                ]
+                               )
+    engine.dispose()
+
+
+def user() -> User:
+    """The benchmark user (detached, only its id and email are used)."""
+    engine = create_engine(database_url())
+    with engine.connect() as connection:
+        row = connection.execute(User.__table__.select().filter(User.email == EMAIL)).one()
+    engine.dispose()
+
+    return User(id=row.id, email=row.email, username=row.username)
+
+
+async def timed(function: Callable[[], Awaitable[Any]], repeat: int) -> float:
+    """Best of `repeat` runs of the coroutine function, seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def table(rows: Iterable[Iterable[Any]], header: Iterable[str]) -> str:
+    rows = [list(map(str, header))] + [list(map(str, row)) for row in rows]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+
+    return '\n'.join('  '.join(value.rjust(width) for value, width in zip(row, widths)) for row in rows)
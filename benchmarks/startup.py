@@ -0,0 +1,69 @@
+"""
+Бенчмарк часу старту: імпорт main (застосунок, роутери, моделі - без підключення до БД) у свіжому
+інтерпретаторі, мс; за вирахуванням порожнього старту python. З --top - найдорожчі модулі за
+python -X importtime (сукупний час імпорту).
+
+python -m benchmarks.startup --repeat 10 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import seed  # first: it points the config at the benchmark database (never opened here)
+
+
+def run_ms(code: str, repeat: int) -> list[float]:
+    """Wall time (ms) of `python -c code` in a fresh process, `repeat` times."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, env=os.environ, stdin=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+
+    return times
+
+
+def import_times(module: str, top: int) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) of the `top` most expensive imports of the module."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            check=True, env=os.environ, stdin=subprocess.DEVNULL, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    return sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+
+
+def main(repeat: int, top: int) -> None:
+    python = run_ms('pass', repeat)
+    app = run_ms('import main', repeat)
+    rows = [
+            ('python', f'{min(python):.0f}', f'{statistics.median(python):.0f}'),
+            ('import main', f'{min(app):.0f}', f'{statistics.median(app):.0f}'),
+            ('import main - python', f'{min(app) - min(python):.0f}',
+             f'{statistics.median(app) - statistics.median(python):.0f}'),
+            ]
+    print(f'fresh interpreter, {repeat} runs, ms')
+    print(seed.table(rows, ('', 'best', 'median')))
+
+    if top:
+        print(f'\n{top} most expensive imports (python -X importtime import main), ms')
+        print(seed.table(
+                         ((name, f'{self_us / 1000:.1f}', f'{cumulative_us / 1000:.1f}')
+                          for name, self_us, cumulative_us in import_times('main', top)),
+                         ('module', 'self', 'cumulative')
+                         ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15)
+    arguments = parser.parse_args()
+    main(arguments.repeat, arguments.top)
@@ -1,38 +1,90 @@
 # FastAPI + REST API example (Contacts) + Authorization
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-import uvicorn
+from contextlib import asynccontextmanager
+import logging
+from typing import AsyncIterator
 
-from src.database.db_connect import get_db
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+
+from src.database.db_connect import dispose_engine, init_engine, replicas
+from src import launcher
 from src.routes import auth, contacts
+from src.services import health, slow_query
+from src.services.cache import invalidation_channel
+from src.services.logs import setup_logging
+from src.services.metrics import instrument_engine, METRICS, MetricsMiddleware, snapshots
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """The engine (and the DB password) is resolved here, not on import: workers, alembic and tests 
+    import the modules without touching the database."""
+    engine = init_engine()
+    if METRICS:
+        instrument_engine(engine)
+    slow_query.instrument_engine(engine)
+    for replica in replicas.replicas:
+        if METRICS:
+            instrument_engine(replica.engine)
+        slow_query.instrument_engine(replica.engine)
+    replicas.start()
+    await invalidation_channel.start(engine)
+    if METRICS:
+        snapshots.start()
+    yield
+    snapshots.stop()
+    await invalidation_channel.stop()
+    await dispose_engine()
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.include_router(auth.router, prefix='/api')
 app.include_router(contacts.router, prefix='/api')
 
+if METRICS:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 async def root() -> dict:
     return {" Welcome! ": " The personal virtual assistant is ready to go, I'm kidding ^_^ "}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    """Per-route latency, status and DB statistics in the Prometheus text format (of all the workers)."""
+    return PlainTextResponse(snapshots.render(), media_type='text/plain; version=0.0.4')
+
+
+@app.get("/api/health/live")
+async def liveness() -> dict:
+    """Liveness probe: the process serves requests, the database is not touched."""
+    return {"alive": True, "pools": health.pools()}
+
+
+@app.get("/api/health/ready")
+async def readiness() -> ORJSONResponse:
+    """Readiness probe: the database answers (a cached ping, see [HEALTH] READY_TTL), 503 if it does not."""
+    ready = await health.readiness.check()
+
+    return ORJSONResponse(
+                          {**health.readiness.status(), "pools": health.pools()},
+                          status_code=200 if ready else 503
+                          )
+
+
 @app.get("/api/healthchecker")
-def healthchecker(db: Session = Depends(get_db)) -> dict: 
-    """Check if the container (DB server) is up."""
-    try:
-        result = db.execute(text("SELECT 1")).fetchone()
-        if result is None:
-            raise HTTPException(status_code=500, detail="Database is not configured correctly!")
-        
-        return {"ALERT": "Welcome to FastAPI! System ready!"}
-    
-    except Exception as e:
-        print(e)
+async def healthchecker() -> dict: 
+    """Check if the container (DB server) is up (the cached readiness ping)."""
+    if not await health.readiness.check():
         raise HTTPException(status_code=500, detail="Error connecting to the database!")
 
+    return {"ALERT": "Welcome to FastAPI! System ready!"}
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host='127.0.0.1', port=8001)
+    # production: several workers (config.ini [SERVER]), development: uvicorn main:app --reload
+    launcher.run()
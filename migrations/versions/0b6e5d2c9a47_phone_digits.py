@@ -0,0 +1,44 @@
+"""Phone_digits
+
+Revision ID: 0b6e5d2c9a47
+Revises: f1a9d3c7e2b8
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e5d2c9a47'
+down_revision = 'f1a9d3c7e2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    postgresql = op.get_context().dialect.name == 'postgresql'
+    if postgresql:  # sqlite INTEGER is already 64-bit
+        op.alter_column('contacts', 'phone', type_=sa.BigInteger(), existing_type=sa.Integer())
+
+    op.add_column('contacts', sa.Column('phone_digits', sa.String(length=20), nullable=True))
+    op.execute('UPDATE contacts SET phone_digits = CAST(phone AS VARCHAR) WHERE phone IS NOT NULL')
+    op.create_index('ix_contacts_user_id_phone_digits', 'contacts', ['user_id', 'phone_digits'], unique=False,
+                    postgresql_ops={'phone_digits': 'text_pattern_ops'})
+    if postgresql:
+        op.drop_index('ix_contacts_phone_trgm', table_name='contacts')
+        op.create_index('ix_contacts_phone_digits_trgm', 'contacts', [sa.text('phone_digits gin_trgm_ops')],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    postgresql = op.get_context().dialect.name == 'postgresql'
+    if postgresql:
+        op.drop_index('ix_contacts_phone_digits_trgm', table_name='contacts')
+        op.create_index('ix_contacts_phone_trgm', 'contacts', [sa.text('(CAST(phone AS VARCHAR)) gin_trgm_ops')],
+                        unique=False, postgresql_using='gin')
+
+    op.drop_index('ix_contacts_user_id_phone_digits', table_name='contacts')
+    op.drop_column('contacts', 'phone_digits')
+    if postgresql:
+        op.alter_column('contacts', 'phone', type_=sa.Integer(), existing_type=sa.BigInteger())
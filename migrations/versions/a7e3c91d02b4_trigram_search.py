@@ -0,0 +1,40 @@
+"""Trigram_search
+
+Revision ID: a7e3c91d02b4
+Revises: 5ce05a816010
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c91d02b4'
+down_revision = '5ce05a816010'
+branch_labels = None
+depends_on = None
+
+TRGM_INDEXES = {
+    'ix_contacts_name_trgm': 'name gin_trgm_ops',
+    'ix_contacts_last_name_trgm': 'last_name gin_trgm_ops',
+    'ix_contacts_email_trgm': 'email gin_trgm_ops',
+    'ix_contacts_phone_trgm': '(CAST(phone AS VARCHAR)) gin_trgm_ops',
+}
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index_name, expression in TRGM_INDEXES.items():
+        op.create_index(index_name, 'contacts', [sa.text(expression)], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    for index_name in TRGM_INDEXES:
+        op.drop_index(index_name, table_name='contacts')
@@ -30,13 +30,16 @@ def upgrade() -> None:
     sa.UniqueConstraint('email')
     )
     op.add_column('contacts', sa.Column('user_id', sa.Integer(), nullable=True))
-    op.create_foreign_key(None, 'contacts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    # batch mode: sqlite can not ALTER constraints, the table is recreated there (plain ALTER on PostgreSQL)
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.create_foreign_key('contacts_user_id_fkey', 'users', ['user_id'], ['id'], ondelete='CASCADE')
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_constraint(None, 'contacts', type_='foreignkey')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_constraint('contacts_user_id_fkey', type_='foreignkey')
     op.drop_column('contacts', 'user_id')
     op.drop_table('users')
     # ### end Alembic commands ###
@@ -0,0 +1,32 @@
+"""Birthday_key
+
+Revision ID: d41b7e6f5a20
+Revises: a7e3c91d02b4
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7e6f5a20'
+down_revision = 'a7e3c91d02b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('bday_key', sa.Integer(), nullable=True))
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('UPDATE contacts SET bday_key = '
+                   'EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday)')
+    else:
+        op.execute("UPDATE contacts SET bday_key = "
+                   "CAST(strftime('%m', birthday) AS INTEGER) * 100 + CAST(strftime('%d', birthday) AS INTEGER)")
+    op.create_index('ix_contacts_user_id_bday_key', 'contacts', ['user_id', 'bday_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_bday_key', table_name='contacts')
+    op.drop_column('contacts', 'bday_key')
@@ -0,0 +1,78 @@
+"""Per_user_unique_contacts
+
+Revision ID: e8c2f4a91b36
+Revises: d41b7e6f5a20
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c2f4a91b36'
+down_revision = 'd41b7e6f5a20'
+branch_labels = None
+depends_on = None
+
+
+# per-user unique constraints: name -> columns
+UNIQUE = {
+    'uq_contacts_user_id_email': ('user_id', 'email'),
+    'uq_contacts_user_id_phone': ('user_id', 'phone'),
+    'uq_contacts_user_id_name_last_name': ('user_id', 'name', 'last_name'),
+}
+
+
+def duplicate_ids(columns: tuple[str, ...]) -> list[list[int]]:
+    """Ids of the contacts sharing the same values of the columns (one list per group, NULLs never collide)."""
+    contacts = sa.table('contacts', sa.column('id'), *(sa.column(column) for column in columns))
+    keys = [contacts.c[column] for column in columns]
+    groups = sa.select(*keys).group_by(*keys).having(sa.func.count() > 1).subquery()
+    rows = op.get_bind().execute(
+                                 sa.select(contacts.c.id, *keys)
+                                 .join(groups, sa.and_(*(key == groups.c[key.name] for key in keys)))
+                                 .order_by(*keys, contacts.c.id)
+                                 )
+    duplicates: dict[tuple, list[int]] = {}
+    for row in rows:
+        duplicates.setdefault(tuple(row[1:]), []).append(row.id)
+
+    return list(duplicates.values())
+
+
+def check_duplicates() -> None:
+    """Fail before any change if a constraint would be violated: the old update_contact did not check
+    (user_id, name, last_name), such rows have to be merged or renamed by hand first."""
+    errors = []
+    for name, columns in UNIQUE.items():
+        groups = duplicate_ids(columns)
+        if groups:
+            shown = '; '.join(', '.join(map(str, ids)) for ids in groups[:20])
+            errors.append(f'{name} {columns}: {len(groups)} groups of duplicate contacts, ids: {shown}'
+                          + (' ...' if len(groups) > 20 else ''))
+    if errors:
+        raise RuntimeError('Duplicate contacts, resolve them and run the migration again:\n' + '\n'.join(errors))
+
+
+def upgrade() -> None:
+    check_duplicates()
+    # email/phone were unique across all users, duplicates are per user
+    op.drop_index('ix_contacts_email', table_name='contacts')
+    op.drop_index('ix_contacts_phone', table_name='contacts')
+    op.create_index(op.f('ix_contacts_email'), 'contacts', ['email'], unique=False)
+    op.create_index(op.f('ix_contacts_phone'), 'contacts', ['phone'], unique=False)
+    # batch mode: sqlite can not ALTER constraints, the table is recreated there (plain ALTER on PostgreSQL)
+    with op.batch_alter_table('contacts') as batch_op:
+        for name, columns in UNIQUE.items():
+            batch_op.create_unique_constraint(name, list(columns))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('contacts') as batch_op:
+        for name in reversed(UNIQUE):
+            batch_op.drop_constraint(name, type_='unique')
+    op.drop_index(op.f('ix_contacts_phone'), table_name='contacts')
+    op.drop_index(op.f('ix_contacts_email'), table_name='contacts')
+    op.create_index('ix_contacts_email', 'contacts', ['email'], unique=True)
+    op.create_index('ix_contacts_phone', 'contacts', ['phone'], unique=True)
@@ -0,0 +1,27 @@
+"""Per_user_indexes
+
+Revision ID: f1a9d3c7e2b8
+Revises: e8c2f4a91b36
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a9d3c7e2b8'
+down_revision = 'e8c2f4a91b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (user_id, email) and (user_id, phone) are already indexed by the per-user unique constraints
+    op.create_index('ix_contacts_user_id_name_id', 'contacts', ['user_id', 'name', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_name_id', table_name='contacts')
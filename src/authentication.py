@@ -1,10 +1,11 @@
 import logging
 import pathlib
+import sys
 
 
 key_file = 'key.txt'
 
-logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+logger = logging.getLogger(__name__)
 
 
 def watcher(function):
@@ -13,7 +14,7 @@ def watcher(function):
             rez = function(*args, **kwargs)
 
         except Exception as error:
-            logging.critical(f'Something wrong!, system error:\n{error}')
+            logger.critical(f'Something wrong!, system error:\n{error}')
             rez = f'{error}'    
 
         return rez
@@ -34,13 +35,18 @@ def load_key(key_file: str) -> str:
 
 
 def get_password(key_file: str = key_file) -> str:
-    """Return password from local file or user input in CLI."""
+    """Return password from local file or user input in CLI. 
+    Without a terminal (container, worker, test run) it never waits for input - the password is empty then."""
     if pathlib.Path(key_file).exists():
-        logging.info(f'Ok! Key-file found.')
+        logger.info('Ok! Key-file found.')
         key = load_key(key_file)
 
-    else:
+    elif sys.stdin is not None and sys.stdin.isatty():
         key: str = input('Enter the KEY:\n')
         save_key(key_file, key) if key else None
+
+    else:
+        logger.error(f'No {key_file} and no terminal to ask for the KEY: set DB_DEV_PASSWORD')
+        key = ''
     
     return key
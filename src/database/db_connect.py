@@ -1,62 +1,430 @@
 # підключення до бази даних (sqlite/PostgreSQL)
+import asyncio
 import configparser  # for work with *.ini (config.ini)
+from contextlib import asynccontextmanager
+import hashlib
+import hmac
+import itertools
 import logging
+import os
 import pathlib
-from typing import Optional
+import time
+from typing import Any, AsyncIterator, Optional, Sequence, Union
 
 from sqlalchemy import (
     create_engine, 
     Engine,
+    insert,
+    text,
+    )
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeout
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
     )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 
 from src.authentication import get_password
 
 
 CONFIG_FILE = 'config.ini'
 
-logging.basicConfig(level=logging.DEBUG, format='%(threadName)s %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class EnvConfigParser(configparser.ConfigParser):
+    """config.ini whose every option can be overridden by an environment variable SECTION_OPTION 
+    (e.g. DB_DEV_PASSWORD, CACHE_USER_CACHE_TTL) - containers are configured without editing the file."""
+    def get(self, section: str, option: str, **kwargs) -> Any:
+        value = os.environ.get(f'{section}_{option}'.upper())
+        if value is not None:
+            return value
 
-file_config = pathlib.Path(__file__).parent.parent.joinpath(CONFIG_FILE)  # try?
-config = configparser.ConfigParser()
+        return super().get(section, option, **kwargs)
+
+
+file_config = os.environ.get('CONFIG_FILE') or pathlib.Path(__file__).parent.parent.joinpath(CONFIG_FILE)
+config = EnvConfigParser()
 config.read(file_config)
 
-user = config.get('DB_DEV', 'user')
-password = get_password()
-database = config.get('DB_DEV', 'db_name')
-host = config.get('DB_DEV', 'host')
-port = config.get('DB_DEV', 'port')
+DBSession = Union[Session, AsyncSession]
+
+
+def database_url(async_mode: bool = False) -> str:
+    """URL of the database from the config, resolved on demand (the password may come from the key file)."""
+    sqlite_file = config.get('DB_DEV', 'sqlite_file', fallback='')
+    if sqlite_file:  # local stand-in for PostgreSQL
+        return f'sqlite+aiosqlite:///{sqlite_file}' if async_mode else f'sqlite:///{sqlite_file}'
+
+    user = config.get('DB_DEV', 'user')
+    password = os.environ.get('DB_DEV_PASSWORD') or get_password()
+    database = config.get('DB_DEV', 'db_name')
+    host = config.get('DB_DEV', 'host')
+    port = config.get('DB_DEV', 'port')
+
+    url = f'postgresql+{"asyncpg" if async_mode else "psycopg2"}://{user}:{password}@{host}:{port}/{database}'
+    if port == '0':
+        url = url.replace(':0/', '/')
+
+    return url
+
+
+def async_url(url: str) -> str:
+    """The same database through the asyncio driver."""
+    return url.replace('postgresql+psycopg2://', 'postgresql+asyncpg://').replace('sqlite://', 'sqlite+aiosqlite://')
+
+
+class TimedPoolMixin:
+    """Checkout statistics of the pool: how long requests wait for a connection (in the queue, 
+    for a new connection and its pre-ping) and how many gave up after pool_timeout."""
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+
+        except PoolTimeout:
+            self.timeouts += 1
+            raise
+
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def recreate(self) -> Any:
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts, pool.wait_total, pool.wait_max = (
+            self.checkouts, self.timeouts, self.wait_total, self.wait_max
+            )
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
 
-SQLALCHEMY_DATABASE_URL = f'postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}'
-if port == '0':
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(':0/', '/')
 
+def pool_stats(engine_: Optional[Union[Engine, AsyncEngine]]) -> dict:
+    """Size, usage and checkout waits (seconds) of the engine's pool."""
+    if engine_ is None:
+        return {}
 
-def create_connection(*args, **kwargs) -> tuple[Optional[Engine], Optional[sessionmaker]]:
-    """Create a database connection (session) to a PostgreSQL database (engine)."""
+    pool = engine_.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+                     size=pool.size(),
+                     checked_out=pool.checkedout(),
+                     checked_in=pool.checkedin(),
+                     overflow=max(pool.overflow(), 0),
+                     max_overflow=pool._max_overflow,
+                     timeout=pool.timeout(),
+                     )
+    if isinstance(pool, TimedPoolMixin):
+        stats.update(
+                     checkouts=pool.checkouts,
+                     timeouts=pool.timeouts,
+                     wait_avg=pool.wait_total / pool.checkouts if pool.checkouts else 0.0,
+                     wait_max=pool.wait_max,
+                     )
+    return stats
+
+
+def create_connection(
+                      *args, 
+                      async_mode: Optional[bool] = None, 
+                      url: Optional[str] = None,
+                      **kwargs
+                      ) -> tuple[Optional[Union[Engine, AsyncEngine]], Optional[Union[sessionmaker, async_sessionmaker]]]:
+    """Create a database connection (session) to a PostgreSQL database (engine), the primary one if url is not given.
+    In async mode the engine runs on asyncpg (aiosqlite for sqlite) and sessions are AsyncSession.
+    ASYNC_MODE=0 keeps the old sync (psycopg2) path, queries are then pushed to the threadpool."""
+    if async_mode is None:
+        async_mode = config.getboolean('DB_DEV', 'async_mode', fallback=True)
+    # ECHO logs every statement (debugging only - it is synchronous logging on the hot path), see [SLOW_QUERY] instead
+    echo = config.getboolean('DB_DEV', 'echo', fallback=False)
+    url = url or database_url()
+    pool_options = {}
+    if not url.startswith('sqlite'):
+        # per process: the launcher divides the connection budget of the server between its workers
+        pool_options = {
+                        'poolclass': TimedAsyncQueuePool if async_mode else TimedQueuePool,
+                        'pool_size': config.getint('DB_DEV', 'pool_size', fallback=10),
+                        'max_overflow': config.getint('DB_DEV', 'max_overflow', fallback=10),
+                        'pool_timeout': config.getfloat('DB_DEV', 'pool_timeout', fallback=30),
+                        'pool_pre_ping': config.getboolean('DB_DEV', 'pool_pre_ping', fallback=False),
+                        'pool_recycle': config.getint('DB_DEV', 'pool_recycle', fallback=-1),
+                        }
     try:
-        engine_ = create_engine(SQLALCHEMY_DATABASE_URL, echo=True, pool_size=10)
-        db_session = sessionmaker(autocommit=False, autoflush=False, bind=engine_)
+        if async_mode:
+            engine_ = create_async_engine(async_url(url), echo=echo, **pool_options)
+            db_session = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine_)
+
+        else:
+            engine_ = create_engine(url, echo=echo, **pool_options)
+            db_session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine_)
     
     except Exception as error:
-        logging.error(f'Wrong connect. error:\n{error}')
+        logger.error(f'Wrong connect. error:\n{error}')
         return None, None
 
     return engine_, db_session
 
 
-engine, SessionLocal = create_connection()
+# created by init_engine() in the lifespan of the app (or on the first get_db), not on import
+engine: Optional[Union[Engine, AsyncEngine]] = None
+SessionLocal: Optional[Union[sessionmaker, async_sessionmaker]] = None
+
+
+class Replica:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.engine, self.session = create_connection(url=url)
+        self.healthy = self.engine is not None
+
+
+class ReplicaSet:
+    """Read-only engines for the query-only endpoints. A session of a healthy replica (round robin) is given
+    unless the reader wrote within the read-your-writes window (replication lag) or no replica is healthy -
+    then it is the primary's. Replicas failing the periodic ping or a query (connection errors) are ejected
+    until a ping succeeds again.
+
+    The window is carried by the client: a write answers with a signed mark (write_mark) and the reads
+    sending it back go to the primary until it expires, whichever worker or host serves them - every one
+    needs the same [DB_REPLICAS] SECRET_KEY and synchronised clocks. The in-process record of the writes
+    (wrote) only covers clients that drop the mark and are served by the same worker."""
+    def __init__(self) -> None:
+        self.replicas: list[Replica] = []
+        self.read_your_writes = config.getfloat('DB_REPLICAS', 'read_your_writes', fallback=5)
+        self.health_interval = config.getfloat('DB_REPLICAS', 'health_interval', fallback=5)
+        self.health_timeout = config.getfloat('DB_REPLICAS', 'health_timeout', fallback=2)
+        self.secret_key = config.get('DB_REPLICAS', 'secret_key', fallback='secret_key').encode()
+        self._writes: dict[Any, float] = {}
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def open(self) -> None:
+        urls = config.get('DB_REPLICAS', 'urls', fallback='')
+        self.replicas = [Replica(url.strip()) for url in urls.split(',') if url.strip()]
+
+    def wrote(self, key: Any) -> None:
+        """The reader `key` (user id) has just written: read it from the primary for a while."""
+        if self.replicas:
+            now = time.monotonic()
+            self._writes[key] = now + self.read_your_writes
+            if len(self._writes) > 10000:
+                self._writes = {key: until for key, until in self._writes.items() if until > now}
+
+    def sign(self, key: Any, until: int) -> str:
+        return hmac.new(self.secret_key, f'{key}.{until}'.encode(), hashlib.sha256).hexdigest()
+
+    def write_mark(self, key: Any) -> Optional[str]:
+        """Signed end (unix time, ms) of the read-your-writes window of the reader `key` who has just written,
+        None without replicas."""
+        if not self.replicas:
+            return None
+
+        until = int((time.time() + self.read_your_writes) * 1000)
+        return f'{until}.{self.sign(key, until)}'
+
+    def marked(self, key: Any, mark: Optional[str]) -> bool:
+        """The mark is the reader's own and its window is still open (capped by READ_YOUR_WRITES)."""
+        until, _, signature = (mark or '').partition('.')
+        if not until.isdigit() or not hmac.compare_digest(signature, self.sign(key, int(until))):
+            return False
+
+        return 0 < int(until) / 1000 - time.time() <= self.read_your_writes
+
+    def choose(self, key: Any = None, mark: Optional[str] = None) -> Optional[Replica]:
+        """The replica to read from, None - the primary."""
+        if self._writes.get(key, 0) > time.monotonic() or self.marked(key, mark):
+            return None
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        return healthy[next(self._next) % len(healthy)] if healthy else None
+
+    def eject(self, replica: Replica, error: Any) -> None:
+        if replica.healthy:
+            logger.warning(f'Read replica {replica.engine.url!r} is ejected: {error}')
+        replica.healthy = False
+
+    async def ping(self, replica: Replica) -> None:
+        db = replica.session()
+        try:
+            await asyncio.wait_for(execute(db, text('SELECT 1')), self.health_timeout)
+            if not replica.healthy:
+                logger.info(f'Read replica {replica.engine.url!r} is back')
+            replica.healthy = True
+
+        except Exception as error:
+            self.eject(replica, error)
+
+        finally:
+            await close(db)
+
+    async def check_health(self) -> None:
+        while True:
+            await asyncio.gather(*(self.ping(replica) for replica in self.replicas if replica.engine is not None))
+            await asyncio.sleep(self.health_interval)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.check_health())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for replica in self.replicas:
+            await dispose(replica.engine)
+        self.replicas = []
+
+
+replicas = ReplicaSet()
+
+
+def init_engine() -> Optional[Union[Engine, AsyncEngine]]:
+    """Create the engine and the session factory once (and the read replicas' ones), return the engine."""
+    global engine, SessionLocal
+    if engine is None:
+        engine, SessionLocal = create_connection()
+        replicas.open()
+
+    return engine
+
+
+async def dispose(engine_: Optional[Union[Engine, AsyncEngine]]) -> None:
+    if isinstance(engine_, AsyncEngine):
+        await engine_.dispose()
+    elif engine_ is not None:
+        await run_in_threadpool(engine_.dispose)
+
+
+async def dispose_engine() -> None:
+    """Close the pooled connections (on shutdown)."""
+    global engine, SessionLocal
+    await replicas.stop()
+    await dispose(engine)
+    engine, SessionLocal = None, None
 
 
 Base = declarative_base()
 
 
 # Dependency
-def get_db():
+async def get_db():
     """Returns a session using a factory: SessionLocal."""  
+    if SessionLocal is None:
+        init_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await close(db)
+
+
+@asynccontextmanager
+async def read_session(key: Any = None, mark: Optional[str] = None) -> AsyncIterator[DBSession]:
+    """Session for a query-only request of the reader `key` with their last write mark (see ReplicaSet), 
+    the primary's without replicas."""
+    if SessionLocal is None:
+        init_engine()
+    replica = replicas.choose(key, mark)
+    db = replica.session() if replica else SessionLocal()
+    try:
+        yield db
+
+    except DBAPIError as error:
+        if replica and (error.connection_invalidated or isinstance(error, OperationalError)):
+            replicas.eject(replica, error)
+        raise
+
+    finally:
+        await close(db)
+
+
+def dialect_insert(db: DBSession) -> Any:
+    """insert() construct of the session's dialect: PostgreSQL and sqlite ones support ON CONFLICT."""
+    return {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(db.bind.dialect.name, insert)
+
+
+# Session helpers: await the I/O natively for AsyncSession, run it in the threadpool for sync Session
+async def execute(db: DBSession, statement: Any, *args, **kwargs) -> Any:
+    """Execute the statement without blocking the event loop."""
+    if isinstance(db, AsyncSession):
+        return await db.execute(statement, *args, **kwargs)
+
+    return await run_in_threadpool(db.execute, statement, *args, **kwargs)
+
+
+async def stream_partitions(db: DBSession, statement: Any, size: int) -> AsyncIterator[Sequence[Any]]:
+    """Rows of the statement in partitions of size, fetched through a server-side cursor (yield_per), 
+    so only one partition is held in memory."""
+    statement = statement.execution_options(yield_per=size)
+    if isinstance(db, AsyncSession):
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            yield partition
+        
+        return
+
+    partitions = (await run_in_threadpool(db.execute, statement)).partitions()
+    while partition := await run_in_threadpool(next, partitions, None):
+        yield partition
+
+
+async def commit(db: DBSession) -> None:
+    """Commit the current transaction."""
+    if isinstance(db, AsyncSession):
+        return await db.commit()
+
+    return await run_in_threadpool(db.commit)
+
+
+async def rollback(db: DBSession) -> None:
+    """Roll back the current transaction."""
+    if isinstance(db, AsyncSession):
+        return await db.rollback()
+
+    return await run_in_threadpool(db.rollback)
+
+
+async def refresh(db: DBSession, instance: Any) -> None:
+    """Reload the attributes of the instance from the database."""
+    if isinstance(db, AsyncSession):
+        return await db.refresh(instance)
+
+    return await run_in_threadpool(db.refresh, instance)
+
+
+async def delete(db: DBSession, instance: Any) -> None:
+    """Mark the instance as deleted (flushed on commit)."""
+    if isinstance(db, AsyncSession):
+        return await db.delete(instance)
+
+    return db.delete(instance)
+
+
+async def close(db: DBSession) -> None:
+    """Release the connection back to the pool."""
+    if isinstance(db, AsyncSession):
+        return await db.close()
+
+    return await run_in_threadpool(db.close)
@@ -1,25 +1,75 @@
-from sqlalchemy import Column, Date, func, Integer, String
-from sqlalchemy.orm import relationship
+from datetime import date
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, Column, Date, func, Index, Integer, String, text, UniqueConstraint
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import DateTime
 
 from src.database.db_connect import Base
 
 
+def birthday_key(birthday: Optional[date]) -> Optional[int]:
+    """Month-day of the birthday as an integer (MMDD, 101..1231) - orderable within a year."""
+    return birthday.month * 100 + birthday.day if birthday else None
+
+
+def normalize_phone(phone: Any) -> Optional[str]:
+    """Digits only text of the phone number (None if there are no digits) - the searchable form of the phone."""
+    return ''.join(char for char in str(phone or '') if char.isdigit()) or None
+
+
 class Contact(Base):
     __tablename__: str = "contacts"
     id = Column(Integer, primary_key=True)
     name = Column(String(30), index=True)
     last_name = Column(String(40), index=True)
-    email = Column(String(30), unique=True, index=True)
-    phone = Column(Integer, unique=True, index=True)
+    email = Column(String(30), index=True)
+    phone = Column(BigInteger, index=True)  # 10-digit numbers do not fit Integer
     birthday = Column(Date, index=True, nullable=True)
+    bday_key = Column(Integer, nullable=True)  # birthday_key(birthday), kept in step by set_birthday
+    phone_digits = Column(String(20), nullable=True)  # normalize_phone(phone), kept in step by set_phone
     description = Column(String(3000))
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref="users")  # створює зв'язок між класами і вказує, що зв'язок є зв'язком m2m
     # backref створює зворотне посилання на клас User,
     # дозволяючи отримати доступ до зв'язаних об'єктів Contact з об'єкта User
 
+    __table_args__ = (
+        # duplicates are per user, create_contact relies on them (INSERT ... ON CONFLICT DO NOTHING)
+        UniqueConstraint('user_id', 'email', name='uq_contacts_user_id_email'),
+        UniqueConstraint('user_id', 'phone', name='uq_contacts_user_id_phone'),
+        UniqueConstraint('user_id', 'name', 'last_name', name='uq_contacts_user_id_name_last_name'),
+        # every contacts query filters on user_id first: the unique constraints above cover lookups by 
+        # email and phone, these - the listings ordered by (name, id) with keyset pages and lookups by id
+        Index('ix_contacts_user_id_name_id', 'user_id', 'name', 'id'),
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        # exact and prefix (LIKE '...%') phone lookups
+        Index('ix_contacts_user_id_phone_digits', 'user_id', 'phone_digits',
+              postgresql_ops={'phone_digits': 'text_pattern_ops'}),
+        Index('ix_contacts_user_id_bday_key', 'user_id', 'bday_key'),
+        # pg_trgm GIN indexes serve the ILIKE '%...%' searches (PostgreSQL only)
+        *(
+            Index(f'ix_contacts_{name}_trgm', expression, postgresql_using='gin').ddl_if(dialect='postgresql')
+            for name, expression in (
+                ('name', text('name gin_trgm_ops')),
+                ('last_name', text('last_name gin_trgm_ops')),
+                ('email', text('email gin_trgm_ops')),
+                ('phone_digits', text('phone_digits gin_trgm_ops')),
+            )
+        ),
+    )
+
+    @validates('birthday')
+    def set_birthday(self, key: str, birthday: Optional[date]) -> Optional[date]:
+        self.bday_key = birthday_key(birthday)
+        return birthday
+
+    @validates('phone')
+    def set_phone(self, key: str, phone: Optional[int]) -> Optional[int]:
+        self.phone_digits = normalize_phone(phone)
+        return phone
+
 
 class User(Base):
     __tablename__ = "users"
@@ -0,0 +1,203 @@
+# пагінація запитів для обох режимів сесії (AsyncSession / Session)
+from base64 import b64decode
+from enum import Enum
+import json
+from math import ceil
+from typing import Any, Callable, Generic, Hashable, Optional, Sequence, TypeVar
+from urllib.parse import unquote
+
+from fastapi import HTTPException, Query, status
+import fastapi_pagination
+from fastapi_pagination.api import create_page
+from fastapi_pagination.bases import AbstractPage, AbstractParams, CursorRawParams, is_cursor
+from fastapi_pagination.cursor import CursorPage, CursorParams, encode_cursor
+from fastapi_pagination.ext.sqlalchemy import count_query, paginate_query
+from fastapi_pagination.ext.utils import unwrap_scalars
+from fastapi_pagination.types import GreaterEqualZero
+from fastapi_pagination.utils import verify_params
+from sqlalchemy import tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import ClauseElement, ColumnElement, Executable, Select
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from src.database.db_connect import DBSession, execute
+from src.services.cache import TTLCache
+
+
+T = TypeVar("T")
+
+
+class CountMode(str, Enum):
+    """How `total` of a Page is filled."""
+    exact = 'exact'  # COUNT(*) over the filtered query
+    skip = 'skip'  # no total (and no pages) - for clients that only scroll
+    estimate = 'estimate'  # planner row estimate (PostgreSQL), exact count elsewhere
+    cached = 'cached'  # per-key counter kept in memory, exact count on a miss
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement (PostgreSQL). The statement is compiled with its bound 
+    parameters - the values (user input) are sent apart from the SQL text, never inlined into it."""
+    inherit_cache = True
+    _traverse_internals = [('statement', InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element: Explain, compiler: Any, **kwargs) -> str:
+    statement = compiler.process(element.statement, **kwargs)
+    compiler._result_columns = []  # the result is the plan, not the rows of the statement
+    return 'EXPLAIN (FORMAT JSON) ' + statement
+
+
+class Page(fastapi_pagination.Page[T], Generic[T]):
+    total: Optional[GreaterEqualZero] = None
+
+
+class KeysetParams(CursorParams):
+    size: int = Query(50, ge=1, le=100, description="Page size")
+
+    def to_raw_params(self) -> CursorRawParams:
+        """Strict decoding: b64decode drops characters outside the alphabet by default, 
+        so `cursor=!!!` would turn into an empty cursor (the first page) instead of an error."""
+        cursor = None
+        if self.cursor:
+            cursor = b64decode(unquote(self.cursor), validate=True).decode()  # ValueError -> 400
+            if not cursor:
+                raise ValueError("Empty cursor")
+
+        return CursorRawParams(cursor=cursor, size=self.size)
+
+
+class KeysetPage(CursorPage[T], Generic[T]):
+    """Opt-in cursor page: `next_page` is an opaque token holding the order key of the last item, 
+    so every page is a `WHERE (keys) > (last keys) ORDER BY keys LIMIT size` index range scan."""
+    __params_type__ = KeysetParams
+
+
+async def paginate(
+                   db: DBSession,
+                   query: Select,
+                   order_by: Sequence[ColumnElement] = (),
+                   params: Optional[AbstractParams] = None,
+                   count: CountMode = CountMode.exact,
+                   counter: Optional[TTLCache] = None,
+                   counter_key: Optional[Hashable] = None,
+                   record: Optional[Callable[..., Any]] = None,
+                   ) -> AbstractPage[Any] | dict:
+    """Paginate a select() statement: the count and the page queries are awaited 
+    (natively or through the threadpool), so the event loop is never blocked.
+    order_by must end with a unique column, it is also the keyset for KeysetPage responses.
+    count picks the way `total` is filled; CountMode.cached needs a counter cache and its key.
+    With record (fast read path) every row is mapped by record(*row) and the page is a plain dict 
+    of the same shape - no pydantic validation, it goes straight to an ORJSONResponse."""
+    try:
+        params, raw_params = verify_params(params, "limit-offset", "cursor")
+    
+    except ValueError:  # broken base64 or not utf-8 in the cursor
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if is_cursor(raw_params):
+        return await paginate_keyset(db, query, order_by, params, raw_params, record)
+
+    items = unwrap_scalars((await execute(db, paginate_query(query.order_by(*order_by), params))).unique().all())
+    total = await count_total(db, query, count, counter, counter_key)
+
+    if record is not None:
+        return {
+                "items": [record(*row) for row in items],
+                "total": total,
+                "page": params.page,
+                "size": params.size,
+                "pages": ceil(total / params.size) if total is not None else None,
+                }
+
+    return create_page(items, total, params)
+
+
+async def count_total(
+                      db: DBSession,
+                      query: Select,
+                      count: CountMode,
+                      counter: Optional[TTLCache] = None,
+                      counter_key: Optional[Hashable] = None,
+                      ) -> Optional[int]:
+    """Number of rows of the query according to the count mode (None for CountMode.skip)."""
+    if count == CountMode.skip:
+        return None
+
+    if count == CountMode.estimate and db.bind.dialect.name == 'postgresql':
+        plan = (await execute(db, Explain(query))).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    if count == CountMode.cached and counter is not None:
+        total = counter.get(counter_key)
+        if total is None:
+            total = (await execute(db, count_query(query))).scalar()
+            counter.set(counter_key, total)
+        
+        return total
+
+    return (await execute(db, count_query(query))).scalar()
+
+
+def cursor_place(cursor: str, order_by: Sequence[ColumnElement]) -> list:
+    """Values of the order columns from a decoded cursor, ValueError if they do not fit the columns:
+    a value of another type would reach the database and fail there (500 on PostgreSQL) instead of 400."""
+    place = json.loads(cursor)
+    if not isinstance(place, list) or len(place) != len(order_by):
+        raise ValueError("The cursor does not match the order columns")
+
+    for value, column in zip(place, order_by):
+        if value is None:  # the key of a row with NULL in a nullable order column
+            continue
+
+        python_type = column.type.python_type
+        # bool is an int subclass: true must not pass for an integer key
+        if not isinstance(value, python_type) or isinstance(value, bool) != (python_type is bool):
+            raise ValueError(f"Invalid cursor value for {column.key}")
+
+    return place
+
+
+async def paginate_keyset(
+                          db: DBSession,
+                          query: Select,
+                          order_by: Sequence[ColumnElement],
+                          params: AbstractParams,
+                          raw_params: CursorRawParams,
+                          record: Optional[Callable[..., Any]] = None,
+                          ) -> AbstractPage[Any] | dict:
+    """Fetch the page after the cursor (no OFFSET, no COUNT): deep pages cost the same as the first one."""
+    if not order_by:
+        raise ValueError("order_by is required for keyset pagination")
+
+    if raw_params.cursor:
+        try:
+            place = cursor_place(raw_params.cursor, order_by)
+        
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        
+        query = query.filter(tuple_(*order_by) > tuple_(*place))
+
+    # 1 extra row to know if there is a next page
+    query = query.order_by(*order_by).limit(raw_params.size + 1)
+    items = unwrap_scalars((await execute(db, query)).unique().all())
+
+    if record is not None:
+        items = [record(*row) for row in items]
+
+    next_ = None
+    if len(items) > raw_params.size:
+        items = items[:raw_params.size]
+        next_ = json.dumps([getattr(items[-1], column.key) for column in order_by])
+
+    if record is not None:
+        return {"items": items, "previous_page": None, "next_page": encode_cursor(next_)}
+
+    return create_page(items, params=params, next_=next_)
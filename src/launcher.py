@@ -0,0 +1,150 @@
+"""
+Запуск API у кількох процесах (воркерах) uvicorn на одному сокеті:
+кількість воркерів - з config.ini або за кількістю ядер, пул з'єднань з БД кожного воркера -
+частка загального бюджету з'єднань PostgreSQL, плавне завершення (drain) за SIGTERM
+та перезапуск воркера після N запитів (обмежує ріст пам'яті).
+"""
+import logging
+import os
+import random
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+
+from src.database.db_connect import config
+
+
+logger = logging.getLogger(__name__)
+
+APP = 'main:app'
+HOST = config.get('SERVER', 'host', fallback='127.0.0.1')
+PORT = config.getint('SERVER', 'port', fallback=8001)
+WORKERS = config.getint('SERVER', 'workers', fallback=0)  # 0 - one per available core
+DB_CONNECTIONS = config.getint('SERVER', 'db_connections', fallback=80)  # of all the workers together
+MAX_REQUESTS = config.getint('SERVER', 'max_requests', fallback=10000)  # 0 - never recycle
+MAX_REQUESTS_JITTER = config.getint('SERVER', 'max_requests_jitter', fallback=1000)
+DRAIN_TIMEOUT = config.getfloat('SERVER', 'drain_timeout', fallback=30)
+
+
+def worker_count(workers: int = WORKERS) -> int:
+    if workers > 0:
+        return workers
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+def share_connections(workers: int, budget: int = DB_CONNECTIONS) -> None:
+    """Pool of every worker: an equal part of the budget and no overflow, so workers * pool stays within it.
+    Passed to the workers by environment (DB_DEV_POOL_SIZE, DB_DEV_MAX_OVERFLOW override config.ini).
+    The LISTEN connection of the cache invalidation channel is taken from this pool too."""
+    os.environ['DB_DEV_POOL_SIZE'] = str(max(budget // workers, 1))
+    os.environ['DB_DEV_MAX_OVERFLOW'] = '0'
+
+
+def share_state(workers: int) -> Optional[str]:
+    """In-process state that only the writing process invalidates is turned off with several workers: 
+    the other workers would answer from a stale copy (the sqlite n-gram index of the like searches, 
+    the contacts counter of count=cached - it counts every time). The metrics of the workers are summed 
+    through a directory of snapshots; returns it if it is a temporary one (to be removed at exit)."""
+    if workers <= 1:
+        return None
+
+    os.environ['SEARCH_NGRAM_INDEX'] = '0'
+    os.environ['CACHE_CONTACTS_COUNTER_TTL'] = '0'
+    if config.get('METRICS', 'multiprocess_dir', fallback=''):
+        return None
+
+    directory = tempfile.mkdtemp(prefix='metrics-')
+    os.environ['METRICS_MULTIPROCESS_DIR'] = directory
+    return directory
+
+
+class Supervisor:
+    """Keeps `workers` uvicorn processes on one listening socket: a worker which exited on its own
+    (max requests reached or crashed) is replaced, SIGTERM/SIGINT drains all of them."""
+    def __init__(self, workers: int, host: str = HOST, port: int = PORT) -> None:
+        self.workers = workers
+        self.config = self.worker_config(host, port)
+        self.socket = self.config.bind_socket()
+        self.processes: list[Any] = []
+        self.should_exit = threading.Event()
+
+    @staticmethod
+    def worker_config(host: str, port: int) -> uvicorn.Config:
+        # jitter: the workers do not all recycle at the same moment
+        limit = MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER) if MAX_REQUESTS else None
+        return uvicorn.Config(APP, host=host, port=port, limit_max_requests=limit, log_config=None)
+
+    def spawn(self) -> Any:
+        config = self.worker_config(self.config.host, self.config.port)
+        process = get_subprocess(config=config, target=uvicorn.Server(config).run, sockets=[self.socket])
+        process.start()
+        logger.info(f'Worker {process.pid} started')
+        return process
+
+    def signal_handler(self, sig: int, frame: Any) -> None:
+        self.should_exit.set()
+
+    def run(self) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.signal_handler)
+
+        logger.info(f'Serving {APP} on http://{self.config.host}:{self.config.port} with {self.workers} workers, '
+                    f'DB pool {os.environ.get("DB_DEV_POOL_SIZE")} per worker')
+        self.processes = [self.spawn() for _ in range(self.workers)]
+        while not self.should_exit.wait(0.5):
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logger.info(f'Worker {process.pid} exited ({process.exitcode}), replacing it')
+                    process.join()
+                    self.processes[index] = self.spawn()
+
+        self.drain()
+
+    def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """SIGTERM: every worker stops accepting, finishes its requests and runs the lifespan shutdown;
+        the ones still busy after the timeout are killed. The parent closes its copy of the listening socket
+        first: once the workers close theirs the port is released and new connections are refused at once
+        instead of waiting in the backlog of a socket nobody accepts on and being reset later."""
+        logger.info(f'Draining {len(self.processes)} workers (at most {timeout} s)')
+        self.socket.close()
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f'Worker {process.pid} did not drain in time, killing it')
+                process.kill()
+                process.join()
+
+
+def run(workers: Optional[int] = None) -> None:
+    """Production entry point: python -m src.launcher (or python main.py)."""
+    workers = worker_count(WORKERS if workers is None else workers)
+    share_connections(workers)
+    metrics_dir = share_state(workers)
+    try:
+        Supervisor(workers).run()
+
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    from src.services.logs import setup_logging
+
+    setup_logging()
+    run()
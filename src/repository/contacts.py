@@ -1,64 +1,281 @@
 # функції для взаємодії з базою даних.
+import dataclasses
 from datetime import date, timedelta
-from typing import Optional
+from functools import lru_cache
+import re
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
 
 from fastapi import HTTPException, status
-from fastapi.encoders import jsonable_encoder
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import cast, func, or_, String
-from sqlalchemy.orm import Session
-
-from src.database.models import Contact, User
-from src.schemes import ContactModel, CatToNameModel, ContactResponse
+from pydantic import ValidationError
+from sqlalchemy import delete as delete_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.database.db_connect import (
+    commit,
+    DBSession,
+    delete,
+    dialect_insert,
+    execute,
+    replicas,
+    rollback,
+    stream_partitions,
+    )
+from src.database.models import birthday_key, Contact, normalize_phone, User
+from src.database.pagination import CountMode, paginate
+from src.schemes import (
+    BulkImportResponse,
+    BulkRowError,
+    ContactModel,
+    ContactRecord,
+    CatToNameModel,
+    ContactsPatch,
+    ContactsSelector,
+    ContactUpdateModel,
+    )
+from src.services.bulk import BATCH_SIZE, EXPORT_CHUNK_SIZE, InvalidRow, MAX_CHANGE, MAX_ERRORS
+from src.services.cache import contacts_counter
+from src.services.ngram import NGRAM_INDEX, ngram_indexes, NGRAM_MAX_CANDIDATES, NgramIndex
+
+
+# stable order (and keyset for cursor pages) of every contact listing
+CONTACTS_ORDER = (Contact.name, Contact.id)
+# read path: plain column tuples mapped into ContactRecord (no ORM hydration, no pydantic per row)
+CONTACT_FIELDS = tuple(field.name for field in dataclasses.fields(ContactRecord))
+CONTACT_COLUMNS = tuple(getattr(Contact, field) for field in CONTACT_FIELDS)
+
+
+def contact_fields(names: Iterable[str]) -> tuple[str, ...]:
+    """Sparse fieldset in the column order; id and name (the keyset) are always there."""
+    names = set(names) | {'id', 'name'}
+    return tuple(field for field in CONTACT_FIELDS if field in names)
+
+
+def contact_columns(fields: Sequence[str]) -> list[Any]:
+    return [getattr(Contact, field) for field in fields]
+
+
+@lru_cache(maxsize=None)
+def contact_record(fields: tuple[str, ...]) -> type:
+    """slots record class of the fieldset (ContactRecord for the full one)."""
+    if fields == CONTACT_FIELDS:
+        return ContactRecord
+
+    return dataclasses.make_dataclass('ContactRecord', fields, slots=True)
+
+
+def derived_values(values: dict) -> dict:
+    """Add the derived columns (bday_key, phone_digits) of the values being written: 
+    Core INSERT/UPDATE statements bypass the model validators that keep them in step."""
+    if 'birthday' in values:
+        values['bday_key'] = birthday_key(values['birthday'])
+    if 'phone' in values:
+        values['phone_digits'] = normalize_phone(values['phone'])
+
+    return values
+
+
+# listings and searches do not load/return the description (String(3000)) unless asked by fields=
+DEFAULT_LIST_FIELDS = contact_fields(field for field in CONTACT_FIELDS if field != 'description')
 
 
 async def get_contacts(
                        user: User, 
-                       db: Session
-                       ) -> Page[ContactResponse]:
+                       db: DBSession,
+                       count: CountMode = CountMode.exact,
+                       fields: Sequence[str] = DEFAULT_LIST_FIELDS
+                       ) -> dict:
     """To retrieve a list of records from a database with the ability to skip 
     a certain number of records and limit the number returned."""
-    return paginate(
-                    db.query(Contact)
-                    .filter(Contact.user_id == user.id)
-                    .order_by(Contact.name)
-                    )
+    return await paginate(
+                          db,
+                          select(*contact_columns(fields))
+                          .filter(Contact.user_id == user.id),
+                          CONTACTS_ORDER,
+                          count=count,
+                          counter=contacts_counter,
+                          counter_key=user.id,
+                          record=contact_record(fields)
+                          )
 
 
 async def get_contact(
                       contact_id: int, 
                       user: User,
-                      db: Session
+                      db: DBSession
                       ) -> Optional[Contact]:
     """To get a particular record by its ID."""
-    return (
-            db.query(Contact)
-            .filter(Contact.user_id == user.id)
-            .filter_by(id=contact_id)
-            .first()
-            )
+    return (await execute(
+                          db,
+                          select(Contact)
+                          .filter(Contact.user_id == user.id)
+                          .filter_by(id=contact_id)
+                          )).scalars().first()
+
+
+async def get_contacts_by_ids(
+                              ids: Sequence[int],
+                              user: User,
+                              db: DBSession,
+                              limit: int = MAX_CHANGE
+                              ) -> dict:
+    """Multi-get: all requested contacts with one WHERE user_id = ? AND id IN (...) query. 
+    Items keep the requested order (repeated ids once), missing - ids not found among the user's contacts."""
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > limit:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f'At most {limit} contacts per request')
+
+    rows = (await execute(
+                          db,
+                          select(*CONTACT_COLUMNS)
+                          .filter(Contact.user_id == user.id, Contact.id.in_(ids))
+                          )).all()
+    found = {row[0]: ContactRecord(*row) for row in rows}
+
+    return {
+            'items': [found[contact_id] for contact_id in ids if contact_id in found],
+            'missing': [contact_id for contact_id in ids if contact_id not in found],
+            }
 
 
 async def create_contact(
                          body: ContactModel, 
                          user: User,
-                         db: Session
+                         db: DBSession
                          ) -> Contact:
-    """Creating a new record in the database. Takes a ContactModel object and uses the information 
-    from it to create a new Contact object, then adds it to the session and 
-    commits the changes to the database."""
-    contact = (db.query(Contact).filter(Contact.user_id == user.id).filter_by(email=body.email).first() or
-               db.query(Contact).filter(Contact.user_id == user.id).filter_by(phone=body.phone).first() or
-               db.query(Contact).filter(Contact.user_id == user.id).filter_by(name=body.name, 
-                                                                              last_name=body.last_name).first())
-    if contact:
+    """Creating a new record in the database. Takes a ContactModel object and inserts it with 
+    a single INSERT ... ON CONFLICT DO NOTHING RETURNING statement: the per-user unique constraints 
+    (email, phone, name + last_name) detect duplicates, no row back means a duplicate."""
+    contact = (await execute(
+                             db,
+                             dialect_insert(db)(Contact)
+                             .values(**derived_values(body.dict()), user_id=user.id)
+                             .on_conflict_do_nothing()
+                             .returning(Contact)
+                             )).scalars().first()
+    if contact is None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Duplicate data')
     
-    contact = Contact(**body.dict(), user_id=user.id)  # , user_id=user.id  or , user=user
-    db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    await commit(db)
+    contacts_changed(user, 1)
+
+    return contact
+
+
+async def import_contacts(
+                          rows: AsyncIterator[tuple[int, Any]],
+                          user: User,
+                          db: DBSession,
+                          batch_size: int = BATCH_SIZE,
+                          max_errors: int = MAX_ERRORS
+                          ) -> BulkImportResponse:
+    """Bulk import: rows are validated by ContactModel as they arrive and written in batches of 
+    multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING (one transaction per batch). 
+    Duplicates (inside a batch or with stored contacts) and invalid rows are reported by row number."""
+    report = BulkImportResponse()
+
+    def add_error(row: int, detail: Any) -> None:
+        if len(report.errors) < max_errors:
+            report.errors.append(BulkRowError(row=row, detail=detail))
+
+    async def flush(batch: list[tuple[int, ContactModel]]) -> None:
+        inserted = set((await execute(
+                                      db,
+                                      dialect_insert(db)(Contact)
+                                      .values([
+                                               dict(**derived_values(body.dict()), user_id=user.id)
+                                               for _, body in batch
+                                               ])
+                                      .on_conflict_do_nothing()
+                                      .returning(Contact.email)
+                                      )).scalars().all())
+        await commit(db)
+        if inserted:  # per batch: a later failure of the upload must not leave committed rows unaccounted
+            contacts_changed(user, len(inserted))
+        for row, body in batch:
+            if body.email not in inserted:
+                report.duplicates += 1
+                add_error(row, 'Duplicate data')
+        
+        report.inserted += len(inserted)
+
+    batch, seen = [], set()
+    async for row, data in rows:
+        if isinstance(data, InvalidRow):
+            report.invalid += 1
+            add_error(row, data.detail)
+            continue
+
+        try:
+            body = ContactModel.parse_obj(data)
+        
+        except ValidationError as error:
+            report.invalid += 1
+            add_error(row, error.errors())
+            continue
+
+        keys = {('email', body.email), ('phone', body.phone), ('name', body.name, body.last_name)}
+        if keys & seen:
+            report.duplicates += 1
+            add_error(row, 'Duplicate data')
+            continue
+
+        seen |= keys
+        batch.append((row, body))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch, seen = [], set()
+
+    if batch:
+        await flush(batch)
+
+    return report
+
+
+def export_contacts(
+                    user: User,
+                    db: DBSession,
+                    chunk_size: int = EXPORT_CHUNK_SIZE
+                    ) -> AsyncIterator[Sequence[Any]]:
+    """All contacts of the user as partitions of column tuples (CONTACT_FIELDS) read through 
+    a server-side cursor - memory stays constant whatever the size of the address book."""
+    return stream_partitions(
+                             db,
+                             select(*CONTACT_COLUMNS)
+                             .filter(Contact.user_id == user.id)
+                             .order_by(*CONTACTS_ORDER),
+                             chunk_size
+                             )
+
+
+async def update_contact_values(
+                                contact_id: int,
+                                values: dict,
+                                user: User,
+                                db: DBSession
+                                ) -> Optional[Contact]:
+    """Write the values with a single UPDATE ... WHERE user_id AND id RETURNING statement. 
+    If the record does not exist - None is returned, a clash with another contact - 409."""
+    if not values:
+        return await get_contact(contact_id, user, db)
+
+    derived_values(values)
+    try:
+        contact = (await execute(
+                                 db,
+                                 update(Contact)
+                                 .where(Contact.user_id == user.id, Contact.id == contact_id)
+                                 .values(**values)
+                                 .returning(Contact)
+                                 )).scalars().first()
+        await commit(db)
+    
+    except IntegrityError:
+        await rollback(db)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Duplicate data')
+
+    if contact is not None:
+        contacts_changed(user)
 
     return contact
 
@@ -67,37 +284,34 @@ async def update_contact(
                          contact_id: int,
                          body: ContactModel,
                          user: User,
-                         db: Session
-                         ) -> Contact:
-    """Update a specific record by its ID. Takes the ContactModel object and updates the information from it 
-    by the name of the record. If the record does not exist - None is returned."""
-    contact: Contact = db.query(Contact).filter(Contact.user_id == user.id).filter_by(id=contact_id).first()
-    # contact: Contact = db.query(Contact).filter(Contact.user_id == user.id).filter(Contact.id == contact_id).first()
-    
-    db_obj_data = jsonable_encoder(contact)
-    body_data = jsonable_encoder(body)
-    
-    for field in db_obj_data:
-        if field in body_data:
-            setattr(contact, field, body_data[field])
-            
-    db.add(contact)
-    db.commit()
-    db.refresh(contact)
+                         db: DBSession
+                         ) -> Optional[Contact]:
+    """Update a specific record by its ID. Takes the ContactModel object and replaces all the fields with it. 
+    If the record does not exist - None is returned."""
+    return await update_contact_values(contact_id, body.dict(), user, db)
 
-    return contact
+
+async def patch_contact(
+                        contact_id: int,
+                        body: ContactUpdateModel,
+                        user: User,
+                        db: DBSession
+                        ) -> Optional[Contact]:
+    """Partial update: only the fields present (and not null) in the body are written."""
+    return await update_contact_values(contact_id, body.dict(exclude_unset=True, exclude_none=True), user, db)
 
 
 async def remove_contact(
                          contact_id: int,
                          user: User,
-                         db: Session
+                         db: DBSession
                          ) -> Optional[Contact]:
     """Delete a specific record by its ID. If the record does not exist - None is returned."""
-    contact = db.query(Contact).filter(Contact.user_id == user.id).filter_by(id=contact_id).first()
+    contact = await get_contact(contact_id, user, db)
     if contact:
-        db.delete(contact)
-        db.commit()
+        await delete(db, contact)
+        await commit(db)
+        contacts_changed(user, -1)
 
     return contact
 
@@ -106,15 +320,95 @@ async def change_name_contact(
                               body: CatToNameModel,
                               contact_id: int,
                               user: User,
-                              db: Session
+                              db: DBSession
                               ) -> Optional[Contact]:
     """To update only the name of the record."""
-    contact = db.query(Contact).filter(Contact.user_id == user.id).filter_by(id=contact_id).first()
-    if contact:
-        contact.name = body.name
-        db.commit()
+    return await update_contact_values(contact_id, {'name': body.name}, user, db)
+
+
+# -=- bulk changes ------------------------------------------------------
+def selected_ids(
+                 selector: ContactsSelector,
+                 user: User,
+                 limit: int = MAX_CHANGE
+                 ) -> Any:
+    """Subquery of (at most limit) ids of the user's contacts chosen by the ids list and/or the filter."""
+    conditions = []
+    if selector.ids is not None:
+        if len(selector.ids) > limit:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=f'At most {limit} contacts per request')
+        conditions.append(Contact.id.in_(selector.ids))
+
+    if selector.filter is not None:
+        exact = selector.filter.dict(exclude={'like'}, exclude_none=True)
+        conditions.extend(getattr(Contact, field) == value for field, value in exact.items())
+        if selector.filter.like:
+            conditions.append(contains_any(selector.filter.like))
+
+    if not conditions:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='Give ids or a filter')
 
-    return contact
+    return (
+            select(Contact.id)
+            .filter(Contact.user_id == user.id, *conditions)
+            .order_by(Contact.id)
+            .limit(limit)
+            .scalar_subquery()
+            )
+
+
+async def remove_contacts(
+                          selector: ContactsSelector,
+                          user: User,
+                          db: DBSession
+                          ) -> list[int]:
+    """Delete the chosen contacts with one DELETE ... RETURNING id statement (one transaction)."""
+    ids = (await execute(
+                         db,
+                         delete_(Contact)
+                         .where(Contact.user_id == user.id, Contact.id.in_(selected_ids(selector, user)))
+                         .returning(Contact.id)
+                         .execution_options(synchronize_session=False)
+                         )).scalars().all()
+    await commit(db)
+    if ids:
+        contacts_changed(user, -len(ids))
+
+    return ids
+
+
+async def patch_contacts(
+                         body: ContactsPatch,
+                         user: User,
+                         db: DBSession
+                         ) -> list[int]:
+    """Write the same values to the chosen contacts with one UPDATE ... RETURNING id statement (one transaction).
+    A clash with the per-user unique constraints rolls back the whole statement - 409."""
+    values = body.values.dict(exclude_unset=True, exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='Nothing to update')
+
+    derived_values(values)
+    try:
+        ids = (await execute(
+                             db,
+                             update(Contact)
+                             .where(Contact.user_id == user.id, Contact.id.in_(selected_ids(body, user)))
+                             .values(**values)
+                             .returning(Contact.id)
+                             .execution_options(synchronize_session=False)
+                             )).scalars().all()
+        await commit(db)
+    
+    except IntegrityError:
+        await rollback(db)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Duplicate data')
+
+    if ids:
+        contacts_changed(user)
+
+    return ids
 
 
 # -=- AND--------------------------------------------------------------
@@ -125,7 +419,7 @@ async def search_by_fields_and(
                                email: str | None,
                                phone: int | None,
                                user: User,
-                               db: Session
+                               db: DBSession
                                ) -> Optional[Contact]:
     """To search for a record by a specific value for field(-s)."""
     # body_data = jsonable_encoder(body)
@@ -133,7 +427,7 @@ async def search_by_fields_and(
 
     #     return None
     
-    # result = db.query(Contact).filter(Contact.user_id == user.id)
+    # result = select(Contact).filter(Contact.user_id == user.id)
     # for field in body_data:
     #     if body[field]:
     #         result = result.filter_by(field=body[field])
@@ -141,7 +435,7 @@ async def search_by_fields_and(
     if not name and not last_name and not email and not phone:
         return None
 
-    result = db.query(Contact).filter(Contact.user_id == user.id)
+    result = select(Contact).filter(Contact.user_id == user.id)
     if name:
         result = result.filter_by(name=name)
     if last_name:
@@ -151,50 +445,162 @@ async def search_by_fields_and(
     if phone:
         result = result.filter_by(phone=phone)
 
-    return result.first()  # db.query(Contact).filter(Contact.user_id == user.id).filter_by(name=name).first()
+    return (await execute(db, result)).scalars().first()
 
 
 # -=- OR ----------------------------------------------------------------
 async def search_by_fields_or(
                               query_str: str,
                               user: User,
-                              db: Session
-                              ) -> Page[ContactResponse]:
-    """To search for an entry by match in all fields: name, last_name, query, phone."""
-    return paginate(
-                    db.query(Contact)
-                    .filter(Contact.user_id == user.id)
-                    .filter(
-                            or_(
-                                Contact.name == query_str, 
-                                Contact.last_name == query_str,
-                                Contact.email == query_str,
-                                cast(Contact.phone, String) == query_str   # !?,
-                                )
-                            )
-                    )
+                              db: DBSession,
+                              count: CountMode = CountMode.exact,
+                              fields: Sequence[str] = DEFAULT_LIST_FIELDS
+                              ) -> dict:
+    """To search for an entry by match in all fields: name, last_name, query, phone 
+    (the phone only for a phone-shaped query)."""
+    conditions = [Contact.name == query_str, Contact.last_name == query_str, Contact.email == query_str]
+    phone_digits = phone_query(query_str)
+    if phone_digits:
+        conditions.append(Contact.phone_digits == phone_digits)
+
+    return await paginate(
+                          db,
+                          select(*contact_columns(fields))
+                          .filter(Contact.user_id == user.id)
+                          .filter(or_(*conditions)),
+                          CONTACTS_ORDER,
+                          count=count,
+                          record=contact_record(fields)
+                          )
 
 
 # https://stackoverflow.com/questions/7942547/using-or-in-sqlalchemy
+# -like- helpers -------------------------------------------------------
+# columns of the partial-match searches (pg_trgm GIN indexed on PostgreSQL)
+LIKE_FIELDS = {
+    'name': Contact.name,
+    'last_name': Contact.last_name,
+    'email': Contact.email,
+    'phone': Contact.phone_digits,
+}
+
+
+# a query that can be (a part of) a phone number: digits with the usual separators
+PHONE_QUERY = re.compile(r'[\d+\-() ]*\d[\d+\-() ]*')
+
+
+def phone_query(query: Any) -> Optional[str]:
+    """Digits of a phone-shaped query (None for any other text, e.g. 'john5' is not a phone)."""
+    query = str(query or '').strip()
+    return normalize_phone(query) if PHONE_QUERY.fullmatch(query) else None
+
+
+def like_parts(parts: dict[str, Any]) -> dict[str, str]:
+    """Search value of each like field as it is stored: digits only for the phone. 
+    Empty values (a phone part that is not phone-shaped) are left out."""
+    parts = {field: phone_query(part) if field == 'phone' else str(part or '') for field, part in parts.items()}
+    return {field: part for field, part in parts.items() if part}
+
+
+def contains_any(query: Any) -> Any:
+    """The query is contained in any of the like fields."""
+    parts = like_parts(dict.fromkeys(LIKE_FIELDS, query))
+    return or_(*(contains(LIKE_FIELDS[field], part) for field, part in parts.items()))
+
+
+def contains(column: Any, value: str) -> Any:
+    """column ILIKE '%value%' with a constant pattern (so the planner can use the trigram index)."""
+    value = value.replace('/', '//').replace('%', '/%').replace('_', '/_')
+    return column.ilike(f'%{value}%', escape='/')
+
+
+async def get_ngram_index(user: User, db: DBSession) -> Optional[NgramIndex]:
+    """In-process n-gram index of the user's contacts, only for sqlite (None elsewhere or if it is off)."""
+    if not NGRAM_INDEX or db.bind.dialect.name != 'sqlite':
+        return None
+
+    index = ngram_indexes.get(user.id)
+    if index is None:
+        index = NgramIndex(LIKE_FIELDS)
+        rows = await execute(
+                             db,
+                             select(Contact.id, *(column.label(field) for field, column in LIKE_FIELDS.items()))
+                             .filter(Contact.user_id == user.id)
+                             )
+        for row in rows:
+            index.add(row.id, row._mapping)
+        
+        ngram_indexes.set(user.id, index)
+
+    return index
+
+
+def ngram_prefilter(result: Any, ids: Optional[set[int]]) -> Any:
+    """Narrow the search to the candidate ids of the n-gram index, only if they are few: 
+    a broad query's long id IN (...) list costs more than the scan it saves."""
+    if ids is None or len(ids) > NGRAM_MAX_CANDIDATES:
+        return result
+
+    return result.filter(Contact.id.in_(ids))
+
+
+def contacts_changed(user: User, delta: int = 0) -> None:
+    """Keep the in-process per-user data (counter, n-gram index) in step with a write 
+    and read the user's contacts from the primary during the read-your-writes window."""
+    replicas.wrote(user.id)
+    if delta:
+        contacts_counter.incr(user.id, delta)
+    ngram_indexes.pop(user.id)
+
+
 # -like- OR------------------------------------------------------------
 async def search_by_like_fields_or(
                                    query_str: str,
                                    user: User,
-                                   db: Session
-                                   ) -> Page[ContactResponse]:
+                                   db: DBSession,
+                                   count: CountMode = CountMode.exact,
+                                   fields: Sequence[str] = DEFAULT_LIST_FIELDS
+                                   ) -> dict:
     """To search for an entry by a partial match in all fields: name, last_name, query, phone."""
-    return paginate(
-                    db.query(Contact)
-                    .filter(Contact.user_id == user.id)
-                    .filter(
-                            or_(
-                                Contact.name.icontains(query_str), 
-                                Contact.last_name.icontains(query_str),
-                                Contact.email.icontains(query_str),
-                                cast(Contact.phone, String).icontains(str(query_str))
-                                )
-                            )
-                    )
+    result = (
+              select(*contact_columns(fields))
+              .filter(Contact.user_id == user.id)
+              .filter(contains_any(query_str))
+              )
+    index = await get_ngram_index(user, db)
+    if index is not None:
+        parts = like_parts(dict.fromkeys(LIKE_FIELDS, query_str))
+        candidates = [index.candidates(field, part) for field, part in parts.items()]
+        if None not in candidates:
+            result = ngram_prefilter(result, set().union(*candidates))
+
+    return await paginate(db, result, CONTACTS_ORDER, count=count, record=contact_record(fields))
+
+
+async def search_by_similarity(
+                               query_str: str,
+                               user: User,
+                               db: DBSession,
+                               count: CountMode = CountMode.exact,
+                               fields: Sequence[str] = DEFAULT_LIST_FIELDS
+                               ) -> dict:
+    """To search for an entry by a partial match in all fields, best matches (pg_trgm similarity) first.
+    Without PostgreSQL the matches are ordered by name."""
+    if db.bind.dialect.name != 'postgresql':
+        return await search_by_like_fields_or(query_str, user, db, count, fields)
+
+    parts = like_parts(dict.fromkeys(LIKE_FIELDS, query_str))
+    rank = func.greatest(*(func.similarity(LIKE_FIELDS[field], part) for field, part in parts.items()))
+
+    return await paginate(
+                          db,
+                          select(*contact_columns(fields))
+                          .filter(Contact.user_id == user.id)
+                          .filter(contains_any(query_str)),
+                          (rank.desc(), Contact.id),
+                          count=count,
+                          record=contact_record(fields)
+                          )
 
 
 # -like- AND-------------------------------------------------------
@@ -204,39 +610,56 @@ async def search_by_like_fields_and(
                                     part_email: str | None,
                                     part_phone: int | None,
                                     user: User,
-                                    db: Session
-                                    ) -> Page[ContactResponse]:
+                                    db: DBSession,
+                                    count: CountMode = CountMode.exact,
+                                    fields: Sequence[str] = DEFAULT_LIST_FIELDS
+                                    ) -> dict:
     """To search for an entry by a partial match in all fields: name, last_name, query, phone."""
     if not part_name and not part_last_name and not part_email and not part_phone:
         return None
 
-    result = db.query(Contact).filter(Contact.user_id == user.id)
-    if part_name:
-        result = result.filter(Contact.name.icontains(part_name))
-    if part_last_name:
-        result = result.filter(Contact.last_name.icontains(part_last_name))
-    if part_email:
-        result = result.filter(Contact.email.icontains(part_email))
-    if part_phone:
-        result = result.filter(cast(Contact.phone, String).icontains(str(part_phone)))
+    parts = {'name': part_name, 'last_name': part_last_name, 'email': part_email, 'phone': part_phone}
+    parts = like_parts(parts)
+    result = select(*contact_columns(fields)).filter(Contact.user_id == user.id)
+    for field, part in parts.items():
+        result = result.filter(contains(LIKE_FIELDS[field], part))
+
+    index = await get_ngram_index(user, db)
+    if index is not None:
+        candidates = [ids for ids in (index.candidates(field, part) for field, part in parts.items()) if ids is not None]
+        if candidates:
+            result = ngram_prefilter(result, set.intersection(*candidates))
     
-    return paginate(result)
+    return await paginate(db, result, CONTACTS_ORDER, count=count, record=contact_record(fields))
 
 
 # ------- search_by_birthday... --------------------------------------------
 async def search_by_birthday_celebration_within_days(
                                                      meantime: int,   
                                                      user: User,
-                                                     db: Session
-                                                     ) -> Page[ContactResponse]: 
-    """To find contacts celebrating birthdays in the next (meantime) days."""
+                                                     db: DBSession,
+                                                     count: CountMode = CountMode.exact,
+                                                     fields: Sequence[str] = DEFAULT_LIST_FIELDS
+                                                     ) -> dict: 
+    """To find contacts celebrating birthdays in the next (meantime) days.
+    Range scan over the (user_id, bday_key) index, split in two ranges when the window crosses the New Year."""
     today = date.today()
     days_limit = date.today() + timedelta(meantime)
-    slide = 1 if days_limit.year - today.year else 0
-
-    return paginate(
-                    db.query(Contact)
-                    .filter(Contact.user_id == user.id)
-                    .filter(func.to_char(Contact.birthday, f'{slide}MM-DD') >= today.strftime(f"0%m-%d"),
-                            func.to_char(Contact.birthday, '0MM-DD') <= days_limit.strftime(f"{slide}%m-%d"))
-                    )
+    start, end = birthday_key(today), birthday_key(days_limit)
+
+    if meantime >= 365:
+        window = Contact.bday_key.is_not(None)
+    elif days_limit.year == today.year:
+        window = Contact.bday_key.between(start, end)
+    else:
+        window = or_(Contact.bday_key >= start, Contact.bday_key <= end)
+
+    return await paginate(
+                          db,
+                          select(*contact_columns(fields))
+                          .filter(Contact.user_id == user.id)
+                          .filter(window),
+                          CONTACTS_ORDER,
+                          count=count,
+                          record=contact_record(fields)
+                          )
@@ -1,17 +1,24 @@
+import logging
+
 from libgravatar import Gravatar  # poetry add libgravatar
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
+from src.database.db_connect import commit, DBSession, execute, refresh
 from src.database.models import User
 from src.schemes import UserModel
+from src.services.cache import invalidate_user
+
+
+logger = logging.getLogger(__name__)
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def get_user_by_email(email: str, db: DBSession) -> User:
     """приймає email та сеанс бази даних db та повертає об'єкт користувача з бази даних, 
     якщо він існує з такою адресою електронної пошти."""
-    return db.query(User).filter(User.email == email).first()
+    return (await execute(db, select(User).filter(User.email == email))).scalars().first()
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: DBSession) -> User:
     """приймає параметр body, який вже пройшов валідацію моделлю користувача UserModel з тіла запиту, 
     та другий параметр - сеанс бази даних db. Створює нового користувача у базі даних, 
     а потім повертає щойно створений об'єкт User."""
@@ -20,16 +27,18 @@ async def create_user(body: UserModel, db: Session) -> User:
         g = Gravatar(body.email)  # об'єкт створює на основі електронної пошти
         avatar = g.get_image()  # отримує URL-адресу аватара з Gravatar API
     except Exception as e:
-        print(e)
+        logger.warning(f'Gravatar is not available: {e}')
     new_user = User(**body.dict(), avatar=avatar)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await invalidate_user(new_user.email, db)
+    await commit(db)
+    await refresh(db, new_user)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
+async def update_token(user: User, token: str | None, db: DBSession) -> None:
     """приймає об'єкт користувача user, токен оновлення token та сеанс бази даних db. 
     Вона оновлює поле refresh_token користувача та фіксує зміни у базі даних."""
     user.refresh_token = token
-    db.commit()
+    await invalidate_user(user.email, db)
+    await commit(db)
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Security
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
 
-from src.database.db_connect import get_db
+from src.database.db_connect import DBSession, get_db
 from src.schemes import UserModel, UserResponse, TokenModel
 from src.repository import users as repository_users
 from src.services.auth import auth_service
@@ -14,7 +13,7 @@ security = HTTPBearer()
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def signup(
                  body: UserModel, 
-                 db: Session = Depends(get_db)
+                 db: DBSession = Depends(get_db)
                  ) -> dict:
     """обробляє операцію POST. Вона створює нового користувача, якщо користувача з такою електронною поштою не існує.
      Не може бути в системі два користувача з однаковим email. Якщо користувач з таким email вже існує в базі даних, 
@@ -24,7 +23,7 @@ async def signup(
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
     
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
 
     return {"user": new_user, "detail": "User successfully created"}
@@ -33,7 +32,7 @@ async def signup(
 @router.post("/login", response_model=TokenModel)
 async def login(
                 body: OAuth2PasswordRequestForm = Depends(), 
-                db: Session = Depends(get_db)
+                db: DBSession = Depends(get_db)
                 ) -> dict:
     """обробляє операцію POST. Вона витягує користувача з бази даних з його email, якщо такого користувача немає, 
     то викликається виняток HTTPException з кодом стану 401 та подробицями detail="Invalid email". 
@@ -45,7 +44,7 @@ async def login(
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
     access_token = await auth_service.create_access_token(data={"sub": user.email})
@@ -58,7 +57,7 @@ async def login(
 @router.get('/refresh_token', response_model=TokenModel)
 async def refresh_token(
                         credentials: HTTPAuthorizationCredentials = Security(security), 
-                        db: Session = Depends(get_db)
+                        db: DBSession = Depends(get_db)
                         ) -> dict:
     """обробляє операцію GET. Вона декодує токен оновлення refresh_token та витягує відповідного користувача з БД. 
     Потім створює нові токени доступу та оновлення, і також оновлює refresh_token в базі даних для користувача. 
@@ -1,34 +1,167 @@
 # Роутер(маршрут) для модуля contacts - містить точки доступу для операцій CRUD
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Path
-from fastapi_pagination import Page, add_pagination  # , paginate  # poetry add fastapi-pagination
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Path, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi_pagination import add_pagination  # , paginate  # poetry add fastapi-pagination
 
-from src.database.db_connect import get_db
+from src.database.db_connect import DBSession, get_db, read_session, replicas
 from src.database.models import Contact, User
+from src.database.pagination import CountMode, KeysetPage, Page
 from src.repository import contacts as repository_contacts
-from src.schemes import ContactModel, ContactResponse, CatToNameModel
+from src.schemes import (
+    BulkImportResponse,
+    ContactModel,
+    ContactResponse,
+    ContactsBatch,
+    ContactsBatchResponse,
+    ContactsChangedResponse,
+    ContactsPatch,
+    ContactsSelector,
+    ContactUpdateModel,
+    CatToNameModel,
+    )
 from src.services.auth import auth_service
+from src.services.bulk import EXPORT_MEDIA_TYPES, rows_reader, write_csv, write_ndjson
 
 
 router = APIRouter(prefix='/contacts')  # tags=["contacts"]
 
 
+def list_fields(
+                fields: str | None = Query(None, description="Comma separated fields to return (id and name always are), "
+                                                             "default - all but description")
+                ) -> tuple[str, ...]:
+    """Sparse fieldset of the listings and searches: limits both the SELECT column list and the items."""
+    if fields is None:
+        return repository_contacts.DEFAULT_LIST_FIELDS
+
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = names - set(repository_contacts.CONTACT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    return repository_contacts.contact_fields(names)
+
+
+# the read-your-writes window travels with the client: set by the writes, sent back by the reads
+WRITE_MARK_COOKIE = 'last_write'
+WRITE_MARK_HEADER = 'X-Last-Write'
+
+
+def mark_write(response: Response, user: User) -> None:
+    """Give the client the signed mark of the user's write (only with read replicas configured)."""
+    mark = replicas.write_mark(user.id)
+    if mark:
+        response.headers[WRITE_MARK_HEADER] = mark
+        response.set_cookie(WRITE_MARK_COOKIE, mark, max_age=int(replicas.read_your_writes) + 1, path='/api',
+                            httponly=True, samesite='lax')
+
+
+async def get_read_db(
+                      request: Request,
+                      last_write: str | None = Header(None, alias=WRITE_MARK_HEADER, include_in_schema=False),
+                      current_user: User = Depends(auth_service.get_current_user)
+                      ) -> AsyncIterator[DBSession]:
+    """Session of the query-only endpoints: a read replica if configured, the primary within 
+    the read-your-writes window after the user's own write (its mark in the header or the cookie)."""
+    async with read_session(current_user.id, last_write or request.cookies.get(WRITE_MARK_COOKIE)) as db:
+        yield db
+
+
+# /cursor/... routes are the same handlers answering with KeysetPage (opaque next_page token, no total)
+# count: how `total` of a Page is filled, exact by default; skip - no count query at all, estimate (planner guess)
+# and cached (per-worker counter) are opt-in: their total is not exact and the page does not say so
+# pages are built from ContactRecord rows and returned as ORJSONResponse: response_model is for the docs only
 @router.get("/", response_model=Page[ContactResponse], tags=['all_contacts'])
+@router.get("/cursor/", response_model=KeysetPage[ContactResponse], tags=['all_contacts'])
 async def get_contacts(
-                       db: Session = Depends(get_db), 
+                       count: CountMode = Query(CountMode.exact),
+                       fields: tuple[str, ...] = Depends(list_fields),
+                       db: DBSession = Depends(get_read_db), 
                        current_user: User = Depends(auth_service.get_current_user)
-                       ) -> Page[ContactResponse]:
-    contacts = await repository_contacts.get_contacts(current_user, db) 
+                       ) -> ORJSONResponse:
+    contacts = await repository_contacts.get_contacts(current_user, db, count, fields) 
+
+    return ORJSONResponse(contacts)
+
+
+@router.delete("/", response_model=ContactsChangedResponse, tags=['all_contacts'])
+async def remove_contacts(
+                          body: ContactsSelector,
+                          response: Response,
+                          db: DBSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)
+                          ) -> dict:
+    ids = await repository_contacts.remove_contacts(body, current_user, db)
+    mark_write(response, current_user)
+
+    return {"ids": ids, "count": len(ids)}
 
-    return contacts
+
+@router.patch("/", response_model=ContactsChangedResponse, tags=['all_contacts'])
+async def patch_contacts(
+                         body: ContactsPatch,
+                         response: Response,
+                         db: DBSession = Depends(get_db),
+                         current_user: User = Depends(auth_service.get_current_user)
+                         ) -> dict:
+    ids = await repository_contacts.patch_contacts(body, current_user, db)
+    mark_write(response, current_user)
+
+    return {"ids": ids, "count": len(ids)}
+
+
+@router.get("/export", response_class=StreamingResponse, tags=['all_contacts'])
+async def export_contacts(
+                          format: str = Query('ndjson', regex='^(ndjson|csv)$'),
+                          db: DBSession = Depends(get_read_db),
+                          current_user: User = Depends(auth_service.get_current_user)
+                          ) -> StreamingResponse:
+    """Streamed export of the whole address book: the next partition is fetched only after 
+    the previous chunk was sent, so a slow client holds back the cursor (backpressure)."""
+    partitions = repository_contacts.export_contacts(current_user, db)
+    if format == 'csv':
+        chunks = write_csv(partitions, repository_contacts.CONTACT_FIELDS)
+    else:
+        chunks = write_ndjson(partitions)
+
+    return StreamingResponse(
+                             chunks,
+                             media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={'Content-Disposition': f'attachment; filename="contacts.{format}"'}
+                             )
+
+
+@router.get("/batch", response_model=ContactsBatchResponse, tags=['contact'])
+async def get_contacts_batch(
+                             ids: str = Query(regex=r'^\d+(,\d+)*$', description="Comma separated contact ids"),
+                             db: DBSession = Depends(get_read_db),
+                             current_user: User = Depends(auth_service.get_current_user)
+                             ) -> ORJSONResponse:
+    """Many contacts by id in one query (instead of N GET /{contact_id}), in the requested order."""
+    contacts = await repository_contacts.get_contacts_by_ids([int(id_) for id_ in ids.split(',')], current_user, db)
+
+    return ORJSONResponse(contacts)
+
+
+@router.post("/batch", response_model=ContactsBatchResponse, tags=['contact'])
+async def post_contacts_batch(
+                              body: ContactsBatch,
+                              db: DBSession = Depends(get_read_db),
+                              current_user: User = Depends(auth_service.get_current_user)
+                              ) -> ORJSONResponse:
+    """The same as GET /batch for id lists too long for a query string."""
+    contacts = await repository_contacts.get_contacts_by_ids(body.ids, current_user, db)
+
+    return ORJSONResponse(contacts)
 
 
 @router.get("/{contact_id}", response_model=ContactResponse, tags=['contact'])
 async def get_contact(
                       contact_id: int = Path(ge=1),
-                      db: Session = Depends(get_db),
+                      db: DBSession = Depends(get_read_db),
                       current_user: User = Depends(auth_service.get_current_user)
                       ) -> Optional[Contact]:
     contact = await repository_contacts.get_contact(contact_id, current_user, db)
@@ -41,36 +174,74 @@ async def get_contact(
 @router.post("/", response_model=ContactResponse,  status_code=status.HTTP_201_CREATED, tags=['contact'])
 async def create_contact(
                          body: ContactModel,
-                         db: Session = Depends(get_db),
+                         response: Response,
+                         db: DBSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)
                          ) -> Contact:
+    contact = await repository_contacts.create_contact(body, current_user, db)
+    mark_write(response, current_user)
 
-    return await repository_contacts.create_contact(body, current_user, db)
+    return contact
+
+
+@router.post("/bulk", response_model=BulkImportResponse, tags=['contact'])
+async def import_contacts(
+                          request: Request,
+                          response: Response,
+                          db: DBSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)
+                          ) -> BulkImportResponse:
+    """Streamed bulk import: NDJSON (application/x-ndjson) or CSV with a header line (text/csv)."""
+    rows = rows_reader(request.headers.get('content-type', ''), request.stream())
+    imported = await repository_contacts.import_contacts(rows, current_user, db)
+    mark_write(response, current_user)
+
+    return imported
 
 
 @router.put("/{contact_id}", response_model=ContactResponse, tags=['contact'])
 async def update_contact(
                          body: ContactModel,
+                         response: Response,
                          contact_id: int = Path(ge=1), 
-                         db: Session = Depends(get_db),
+                         db: DBSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)
                          ) -> Contact:  
     contact = await repository_contacts.update_contact(contact_id, body, current_user, db)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
+    mark_write(response, current_user)
+
+    return contact
+
+
+@router.patch("/{contact_id}", response_model=ContactResponse, tags=['contact'])
+async def patch_contact(
+                        body: ContactUpdateModel,
+                        response: Response,
+                        contact_id: int = Path(ge=1), 
+                        db: DBSession = Depends(get_db),
+                        current_user: User = Depends(auth_service.get_current_user)
+                        ) -> Contact:  
+    contact = await repository_contacts.patch_contact(contact_id, body, current_user, db)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
+    mark_write(response, current_user)
 
     return contact
 
 
 @router.delete("/{contact_id}", response_model=ContactResponse, tags=['contact'])
 async def remove_contact(
+                         response: Response,
                          contact_id: int = Path(ge=1),
-                         db: Session = Depends(get_db),
+                         db: DBSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)
                          ) -> Optional[Contact]:
     contact = await repository_contacts.remove_contact(contact_id, current_user, db)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
+    mark_write(response, current_user)
     
     return contact
 
@@ -78,29 +249,35 @@ async def remove_contact(
 @router.patch("/{contact_id}/to_name", response_model=ContactResponse, tags=['contact'])
 async def change_name_contact(
                               body: CatToNameModel,
+                              response: Response,
                               contact_id: int = Path(ge=1),
-                              db: Session = Depends(get_db),
+                              db: DBSession = Depends(get_db),
                               current_user: User = Depends(auth_service.get_current_user)
                               ) -> Optional[Contact]:
     contact = await repository_contacts.change_name_contact(body, contact_id, current_user, db)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    mark_write(response, current_user)
 
     return contact
 
 
 # ---SEARCH---------------------------------------------------
 @router.get("/search_by_birthday_celebration_within_days/{days}", response_model=Page[ContactResponse], tags=['search'])
+@router.get("/cursor/search_by_birthday_celebration_within_days/{days}", response_model=KeysetPage[ContactResponse], 
+            tags=['search'])
 async def search_by_birthday_celebration_within_days(
                                                      days: int,
-                                                     db: Session = Depends(get_db),
+                                                     count: CountMode = Query(CountMode.exact),
+                                                     fields: tuple[str, ...] = Depends(list_fields),
+                                                     db: DBSession = Depends(get_read_db),
                                                      current_user: User = Depends(auth_service.get_current_user)
-                                                     ) -> Page[ContactResponse]:
-    contact = await repository_contacts.search_by_birthday_celebration_within_days(days, current_user, db)
+                                                     ) -> ORJSONResponse:
+    contact = await repository_contacts.search_by_birthday_celebration_within_days(days, current_user, db, count, fields)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
     
-    return contact
+    return ORJSONResponse(contact)
 
 
 # https://fastapi.tiangolo.com/tutorial/query-params/#__tabbed_2_1
@@ -111,7 +288,7 @@ async def search_by_fields_and(
                                last_name: str | None = None,
                                email: str | None = None,
                                phone: int | None = None,
-                               db: Session = Depends(get_db),
+                               db: DBSession = Depends(get_read_db),
                                current_user: User = Depends(auth_service.get_current_user)
                                ) -> Optional[Contact]:
     contact = await repository_contacts.search_by_fields_and(name, last_name, email, phone, current_user, db=db)
@@ -123,45 +300,70 @@ async def search_by_fields_and(
 
 
 @router.get("/search_by_fields_or/{query_str}", response_model=Page[ContactResponse], tags=['search'])
+@router.get("/cursor/search_by_fields_or/{query_str}", response_model=KeysetPage[ContactResponse], tags=['search'])
 async def search_by_fields_or(
                               query_str: str,
-                              db: Session = Depends(get_db),
+                              count: CountMode = Query(CountMode.exact),
+                              fields: tuple[str, ...] = Depends(list_fields),
+                              db: DBSession = Depends(get_read_db),
                               current_user: User = Depends(auth_service.get_current_user)
-                              ) -> Page[ContactResponse]:
-    contact = await repository_contacts.search_by_fields_or(query_str, current_user, db)
+                              ) -> ORJSONResponse:
+    contact = await repository_contacts.search_by_fields_or(query_str, current_user, db, count, fields)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
     
-    return contact
+    return ORJSONResponse(contact)
 
 
 @router.get("/search_by_like_fields_or/{query_str}", response_model=Page[ContactResponse], tags=['search'])
+@router.get("/cursor/search_by_like_fields_or/{query_str}", response_model=KeysetPage[ContactResponse], tags=['search'])
 async def search_by_like_fields_or(
                                    query_str: str,
-                                   db: Session = Depends(get_db),
+                                   count: CountMode = Query(CountMode.exact),
+                                   fields: tuple[str, ...] = Depends(list_fields),
+                                   db: DBSession = Depends(get_read_db),
                                    current_user: User = Depends(auth_service.get_current_user)
-                                   ) -> Page[ContactResponse]:
-    contact = await repository_contacts.search_by_like_fields_or(query_str, current_user, db)
+                                   ) -> ORJSONResponse:
+    contact = await repository_contacts.search_by_like_fields_or(query_str, current_user, db, count, fields)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
     
-    return contact
+    return ORJSONResponse(contact)
+
+
+@router.get("/search_by_similarity/{query_str}", response_model=Page[ContactResponse], tags=['search'])
+async def search_by_similarity(
+                               query_str: str,
+                               count: CountMode = Query(CountMode.exact),
+                               fields: tuple[str, ...] = Depends(list_fields),
+                               db: DBSession = Depends(get_read_db),
+                               current_user: User = Depends(auth_service.get_current_user)
+                               ) -> ORJSONResponse:
+    contact = await repository_contacts.search_by_similarity(query_str, current_user, db, count, fields)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
+    
+    return ORJSONResponse(contact)
 
 
 @router.get("/search_by_like_fields_and/", response_model=Page[ContactResponse], tags=['search'])
+@router.get("/cursor/search_by_like_fields_and/", response_model=KeysetPage[ContactResponse], tags=['search'])
 async def search_by_like_fields_and(
                                     name: str | None = None,
                                     last_name: str | None = None,
                                     email: str | None = None,
                                     phone: int | None = None,
-                                    db: Session = Depends(get_db),
+                                    count: CountMode = Query(CountMode.exact),
+                                    fields: tuple[str, ...] = Depends(list_fields),
+                                    db: DBSession = Depends(get_read_db),
                                     current_user: User = Depends(auth_service.get_current_user)
-                                    ) -> Page[ContactResponse]:
-    contact = await repository_contacts.search_by_like_fields_and(name, last_name, email, phone, current_user, db=db)
+                                    ) -> ORJSONResponse:
+    contact = await repository_contacts.search_by_like_fields_and(name, last_name, email, phone, current_user, 
+                                                                  db=db, count=count, fields=fields)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact Not Found")
     
-    return contact
+    return ORJSONResponse(contact)
 
 
 add_pagination(router)
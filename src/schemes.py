@@ -1,5 +1,8 @@
 # Схеми для валідації вхідних та вихідних даних
+from dataclasses import dataclass
 from datetime import date, datetime
+from typing import Any
+
 from pydantic import BaseModel, Field, EmailStr  # poetry add pydantic[email] 
 
 
@@ -23,6 +26,46 @@ class ContactQuery(BaseModel):
 '''
 
 
+class ContactUpdateModel(BaseModel):
+    """часткове оновлення контакту: передаються лише поля, що змінюються."""
+    name: str | None = Field(default=None, min_length=2, max_length=30)
+    last_name: str | None = Field(default=None, min_length=2, max_length=40)
+    email: EmailStr | None = None
+    phone: int | None = Field(default=None, gt=0, le=9999999999)
+    birthday: date | None = None
+    description: str | None = Field(default=None, max_length=3000)
+
+
+class ContactFilter(BaseModel):
+    """фільтр масових операцій: точний збіг полів та/або частковий збіг like (по name, last_name, email, phone)."""
+    name: str | None = None
+    last_name: str | None = None
+    email: str | None = None
+    phone: int | None = None
+    like: str | None = Field(default=None, min_length=1)
+
+
+class ContactsSelector(BaseModel):
+    """вибір контактів для масових операцій: список id та/або фільтр (хоча б одне з двох)."""
+    ids: list[int] | None = None
+    filter: ContactFilter | None = None
+
+
+class ContactsPatch(ContactsSelector):
+    values: ContactUpdateModel
+
+
+class ContactsChangedResponse(BaseModel):
+    """id змінених (видалених) контактів."""
+    ids: list[int]
+    count: int
+
+
+class ContactsBatch(BaseModel):
+    """id контактів для отримання одним запитом (POST-варіант для довгих списків)."""
+    ids: list[int] = Field(min_items=1)
+
+
 class ContactResponse(ContactModel):
     id: int = 1 
 
@@ -30,6 +73,25 @@ class ContactResponse(ContactModel):
         orm_mode = True
 
 
+@dataclass(slots=True)
+class ContactRecord:
+    """легкий запис контакту для швидкого шляху читання: заповнюється з кортежу колонок, 
+    без ORM та валідації pydantic, orjson серіалізує його напряму. Поля - як у ContactResponse."""
+    id: int
+    name: str
+    last_name: str
+    email: str
+    phone: int
+    birthday: date | None
+    description: str | None
+
+
+class ContactsBatchResponse(BaseModel):
+    """контакти у порядку запитаних id та id, яких немає (або вони чужі)."""
+    items: list[ContactResponse]
+    missing: list[int]
+
+
 class CatToNameModel(BaseModel):
     name: str = Field(default='Unknown-next', min_length=2, max_length=30)
 
@@ -65,3 +127,17 @@ class TokenModel(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
+
+
+class BulkRowError(BaseModel):
+    """помилка одного рядка масового імпорту (row - номер рядка даних, з 1)."""
+    row: int
+    detail: Any
+
+
+class BulkImportResponse(BaseModel):
+    """підсумок масового імпорту контактів."""
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list[BulkRowError] = []  # перші BULK.MAX_ERRORS помилок
@@ -2,21 +2,70 @@
 визначимо клас служби аутентифікації Auth. 
 Вона має кілька методів для підтримки операцій аутентифікації та авторизації.
 """
-from typing import Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Optional
 
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
 
-from src.database.db_connect import get_db
+from src.database.db_connect import config, DBSession, get_db
 from src.repository import users as repository_users
+from src.services.cache import token_cache, user_cache
+from src.services.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashExecutor:
+    """виконує bcrypt у власному пулі потоків (bcrypt відпускає GIL), щоб не блокувати цикл подій.
+    Кількість одночасних задач обмежена: workers + queue_limit, понад це - відповідь 503, 
+    тож шторм логінів деградує лише /api/auth/*, а не весь API. Глибина черги, відмови та затримка - у /metrics."""
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.in_flight = 0
+
+    def update_gauges(self) -> None:
+        metrics.hash_in_flight = self.in_flight
+        metrics.hash_queue_depth = max(self.in_flight - self.workers, 0)
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Run function(*args) in the pool or reject it with 503 if the queue is full."""
+        if self.in_flight >= self.workers + self.queue_limit:
+            metrics.hash_rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+        self.update_gauges()
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        
+        finally:
+            self.in_flight -= 1
+            self.update_gauges()
+            metrics.hash_latency.observe(time.perf_counter() - start)
 
 
 class Auth:
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hash_executor = HashExecutor(
+                                 workers=config.getint('AUTH', 'hash_workers', fallback=2),
+                                 queue_limit=config.getint('AUTH', 'hash_queue_limit', fallback=32)
+                                 )
     SECRET_KEY = "secret_key"
     ALGORITHM = "HS256"
     """забезпечує авторизацію по bearer токену. Він потрібний для валідації JWT токена, 
@@ -26,14 +75,14 @@ class Auth:
     замість значення username, будемо підставляти в полі email користувача."""
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")  # 
 
-    def verify_password(self, plain_password, hashed_password) -> bool:
-        """перевіряє, чи відповідає простий текстовий пароль хешованому паролю."""
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password) -> bool:
+        """перевіряє, чи відповідає простий текстовий пароль хешованому паролю (у пулі hash_executor)."""
+        return await self.hash_executor.run(self.pwd_context.verify, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
-        """хешує пароль за допомогою алгоритму bcrypt. (look at line 31)
+    async def get_password_hash(self, password: str):
+        """хешує пароль за допомогою алгоритму bcrypt у пулі hash_executor.
         повертає зашифрований пароль, згенерований за допомогою методу hash з класу CryptContext."""
-        return self.pwd_context.hash(password)
+        return await self.hash_executor.run(self.pwd_context.hash, password)
 
     # define a function to generate a new access token
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -88,7 +137,7 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
         """авторизує користувача, розшифровуючи токен доступу access_token та, перевіряючи існування користувача у БД.
         використовується для авторизації користувача на основі його токена доступу: access_token. 
         При цьому ми використовуємо клас OAuth2PasswordBearer для витягування токена із запиту, а потім 
@@ -100,24 +149,34 @@ class Auth:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
+        token_key = hashlib.sha256(token.encode()).digest()
+        email = token_cache.get(token_key)
+        if email is None:
+            try:
+                # Decode JWT
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+                if payload['scope'] == 'access_token':
+                    email = payload["sub"]
+                    if email is None:
+                        raise credentials_exception
+                    
+                else:
                     raise credentials_exception
                 
-            else:
+            except JWTError as e:
+                logger.info(f'Invalid access token: {e}')
                 raise credentials_exception
             
-        except JWTError as e:
-            print(e)
-            raise credentials_exception
+            # already verified token is trusted until its exp
+            token_cache.set(token_key, email, ttl=payload['exp'] - time.time())
 
-        user = await repository_users.get_user_by_email(email, db)
+        user = user_cache.get(email)
         if user is None:
-            raise credentials_exception
+            user = await repository_users.get_user_by_email(email, db)
+            if user is None:
+                raise credentials_exception
+            
+            user_cache.set(email, user)
         
         return user
 
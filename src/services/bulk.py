@@ -0,0 +1,140 @@
+"""
+Потокове читання завантажень (NDJSON / CSV) для масового імпорту контактів та запис для експорту: 
+рядки розбираються/форматуються по мірі надходження, весь файл ніколи не тримається в пам'яті.
+"""
+import codecs
+import csv
+from dataclasses import dataclass
+import io
+import json
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+from src.database.db_connect import config
+
+
+BATCH_SIZE = config.getint('BULK', 'batch_size', fallback=1000)
+EXPORT_CHUNK_SIZE = config.getint('BULK', 'export_chunk_size', fallback=1000)
+MAX_CHANGE = config.getint('BULK', 'max_change', fallback=1000)  # rows per bulk update/delete and multi-get
+MAX_ERRORS = config.getint('BULK', 'max_errors', fallback=1000)
+MAX_LINE_LENGTH = config.getint('BULK', 'max_line_length', fallback=65536)  # characters of one uploaded row
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json')
+CSV_TYPES = ('text/csv',)
+
+
+@dataclass(slots=True)
+class InvalidRow:
+    """A row the reader could not even parse (reported by the import as invalid)."""
+    detail: str
+
+
+TOO_LONG = InvalidRow(f'Line longer than {MAX_LINE_LENGTH} characters')
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_LENGTH) -> AsyncIterator[Optional[str]]:
+    """Split a byte stream into text lines (utf-8), keeping only the unfinished line in memory.
+    A line longer than max_length is dropped up to its newline and yielded as None: an upload without 
+    newlines is never buffered whole."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    tail = ''
+    skipping = False  # inside a too long line
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split('\n')
+        tail = lines.pop()
+        for line in lines:
+            if skipping:  # the rest of the too long line
+                skipping = False
+            else:
+                yield line if len(line) <= max_length else None
+
+        if len(tail) > max_length:
+            if not skipping:
+                yield None
+            skipping, tail = True, ''
+
+    tail += decoder.decode(b'', final=True)
+    if tail and not skipping:
+        yield tail if len(tail) <= max_length else None
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Any]]:
+    """(row number, object) for every non-empty line; a line that is not JSON is passed on as is."""
+    row = 0
+    async for line in iter_lines(chunks):
+        if line is None:
+            row += 1
+            yield row, TOO_LONG
+            continue
+
+        if not line.strip():
+            continue
+
+        row += 1
+        try:
+            yield row, json.loads(line)
+        
+        except ValueError:
+            yield row, line
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Any]]:
+    """(row number, dict by the header) for every data line (one record per line)."""
+    header = None
+    row = 0
+    async for line in iter_lines(chunks):
+        if line is None:
+            if header is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'CSV header: {TOO_LONG.detail}')
+            row += 1
+            yield row, TOO_LONG
+            continue
+
+        if not line.strip():
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        yield row, {name: value for name, value in zip(header, values) if value != ''}
+
+
+def rows_reader(content_type: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Any]]:
+    """Pick the reader by the request Content-Type."""
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson(chunks)
+
+    if media_type in CSV_TYPES:
+        return iter_csv(chunks)
+
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, 
+                        detail=f"Use one of: {', '.join(NDJSON_TYPES + CSV_TYPES)}")
+
+
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+async def write_ndjson(partitions: AsyncIterator[Sequence[Any]]) -> AsyncIterator[str]:
+    """One NDJSON chunk per partition of rows."""
+    async for partition in partitions:
+        yield ''.join(json.dumps(row._asdict(), default=str) + '\n' for row in partition)
+
+
+async def write_csv(partitions: AsyncIterator[Sequence[Any]], fields: Sequence[str]) -> AsyncIterator[str]:
+    """Header line, then one CSV chunk per partition of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(fields)
+    async for partition in partitions:
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():  # nothing was exported - the header only
+        yield buffer.getvalue()
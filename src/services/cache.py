@@ -0,0 +1,149 @@
+"""
+In-process кеші (TTL + LRU) та необов'язковий канал інвалідації між процесами (PostgreSQL LISTEN/NOTIFY).
+"""
+from collections import OrderedDict
+import logging
+import time
+from typing import Any, Callable, Hashable, Optional
+
+from sqlalchemy import text
+
+from src.database.db_connect import config, DBSession, execute
+
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ttl seconds (or at an explicit moment)."""
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (and mark it as recently used) or default if missing/expired."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expire, value = item
+        if expire <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store the value for ttl seconds (the cache default if not given), evicting the LRU entry if full."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def incr(self, key: Hashable, delta: int = 1) -> None:
+        """Add delta to a cached counter (keeping its expiry), a missing counter stays missing."""
+        item = self._data.get(key)
+        if item is not None:
+            self._data[key] = (item[0], item[1] + delta)
+
+    def pop(self, key: Hashable) -> Any:
+        """Drop the entry (if any) and return its value."""
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self) is not self
+
+    def metrics(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class InvalidationChannel:
+    """Cross-process invalidation over PostgreSQL LISTEN/NOTIFY: every worker listens on the channel 
+    and drops the keys other workers publish. NOTIFY is transactional - it is delivered on commit."""
+    def __init__(self, channel: str) -> None:
+        self.channel = channel
+        self.handlers: list[Callable[[str], None]] = []
+        self._connection = None
+
+    def subscribe(self, handler: Callable[[str], None]) -> None:
+        self.handlers.append(handler)
+
+    async def publish(self, key: str, db: DBSession) -> None:
+        """Queue a notification in the current transaction of db (no-op if the channel is off)."""
+        if self.channel and db.bind.dialect.name == 'postgresql':
+            await execute(db, text("SELECT pg_notify(:channel, :key)"), {"channel": self.channel, "key": key})
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        for handler in self.handlers:
+            handler(payload)
+
+    async def start(self, engine: Any) -> None:
+        """Open a dedicated asyncpg connection and LISTEN on the channel (async PostgreSQL engine only)."""
+        if not self.channel or not hasattr(engine, 'sync_engine') or engine.dialect.name != 'postgresql':
+            return
+
+        try:
+            self._connection = await engine.connect()
+            raw_connection = await self._connection.get_raw_connection()
+            await raw_connection.driver_connection.add_listener(self.channel, self._on_notification)
+        
+        except Exception as error:
+            logger.error(f'Cache invalidation channel is off. error:\n{error}')
+            self._connection = None
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+user_cache = TTLCache(
+                      maxsize=config.getint('CACHE', 'user_cache_size', fallback=1024),
+                      ttl=config.getfloat('CACHE', 'user_cache_ttl', fallback=60)
+                      )
+# sha256(access token) -> email, every entry lives until the token's exp (at most the cache ttl).
+# Access tokens are not revoked: a login or a refresh does not end the tokens issued before, each one is valid
+# (and cached) until its exp, so nothing has to be dropped from here when the user changes
+token_cache = TTLCache(
+                       maxsize=config.getint('CACHE', 'token_cache_size', fallback=4096),
+                       ttl=config.getfloat('CACHE', 'token_cache_ttl', fallback=900)
+                       )
+# user id -> number of contacts, kept up to date by create_contact/remove_contact 
+# (other workers' writes show up after the ttl)
+contacts_counter = TTLCache(
+                            maxsize=config.getint('CACHE', 'contacts_counter_size', fallback=1024),
+                            ttl=config.getfloat('CACHE', 'contacts_counter_ttl', fallback=60)
+                            )
+invalidation_channel = InvalidationChannel(config.get('CACHE', 'invalidation_channel', fallback=''))
+
+
+def drop_user(email: str) -> None:
+    """Forget the cached user (its verified tokens stay cached: they are valid until their exp anyway)."""
+    user_cache.pop(email)
+
+
+invalidation_channel.subscribe(drop_user)
+
+
+async def invalidate_user(email: str, db: DBSession) -> None:
+    """Drop the cached user locally and ask the other workers to do the same."""
+    drop_user(email)
+    await invalidation_channel.publish(email, db)
@@ -0,0 +1,82 @@
+"""
+Перевірки стану для оркестратора (Kubernetes probes): liveness - без звернення до БД,
+readiness - ping БД, результат якого кешується на короткий час, обидві - зі статистикою пулів з'єднань.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from src.database import db_connect
+from src.database.db_connect import config, pool_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessCheck:
+    """SELECT 1 on the primary at most once per ttl: concurrent probes wait for the same ping,
+    the others get the cached result, so probes do not compete with the requests for the pool."""
+    def __init__(self, ttl: float, timeout: float) -> None:
+        self.ttl = ttl
+        self.timeout = timeout
+        self.checked_at = 0.0
+        self.ready = False
+        self.error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def ping(self) -> None:
+        engine = db_connect.init_engine()
+        if engine is None:
+            raise RuntimeError('Database is not configured correctly!')
+
+        if hasattr(engine, 'sync_engine'):
+            async with engine.connect() as connection:
+                await connection.execute(text('SELECT 1'))
+        else:
+            await run_in_threadpool(self._sync_ping, engine)
+
+    @staticmethod
+    def _sync_ping(engine: Any) -> None:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+    async def check(self) -> bool:
+        async with self._lock:
+            if time.monotonic() - self.checked_at >= self.ttl:
+                try:
+                    await asyncio.wait_for(self.ping(), self.timeout)
+                    self.ready, self.error = True, None
+
+                except Exception as error:
+                    if self.ready or self.error is None:
+                        logger.error(f'Database is not ready: {error}')
+                    self.ready, self.error = False, str(error) or type(error).__name__
+
+                self.checked_at = time.monotonic()
+
+        return self.ready
+
+    def status(self) -> dict:
+        return {
+                'ready': self.ready,
+                'error': self.error,
+                'checked_ago': round(time.monotonic() - self.checked_at, 3) if self.checked_at else None,
+                }
+
+
+readiness = ReadinessCheck(
+                           ttl=config.getfloat('HEALTH', 'ready_ttl', fallback=2),
+                           timeout=config.getfloat('HEALTH', 'ping_timeout', fallback=2)
+                           )
+
+
+def pools() -> dict:
+    """Statistics of the primary's pool and of every read replica's one."""
+    stats = {'primary': pool_stats(db_connect.engine)}
+    for index, replica in enumerate(db_connect.replicas.replicas):
+        stats[f'replica_{index}'] = {'healthy': replica.healthy, **pool_stats(replica.engine)}
+    return stats
@@ -0,0 +1,91 @@
+"""
+Центральне налаштування логування: запит лише кладе запис у чергу (QueueHandler),
+форматування у JSON та запис у потік виконує окремий потік (QueueListener).
+"""
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import sys
+from typing import Optional
+
+import orjson
+
+from src.database.db_connect import config
+
+
+# attributes of every LogRecord - everything else on a record came from extra={...}
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, thread, message, the extra fields and the traceback."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+                 'time': self.formatTime(record),
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'thread': record.threadName,
+                 'message': record.getMessage(),
+                 }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+
+        return orjson.dumps(entry, default=str).decode()
+
+
+class RequestQueueHandler(QueueHandler):
+    """Only the cheap part on the calling thread: the message is merged with its args and
+    the traceback rendered (it can not be done later), the extra fields stay for the formatter."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Route every logger through the queue; levels: [LOGGING] LEVEL for the root, [LOGGERS] name=LEVEL per module."""
+    global listener
+    if listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if config.get('LOGGING', 'format', fallback='json') == 'json':
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(threadName)s %(message)s'))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(RequestQueueHandler(log_queue))
+    root.setLevel(config.get('LOGGING', 'level', fallback='INFO').upper())
+    if config.has_section('LOGGERS'):
+        for name, level in config.items('LOGGERS'):
+            logging.getLogger(name).setLevel(level.upper())
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush the queue and stop the listener thread. Only at process exit (atexit): the listener outlives
+    the application lifespan, so the server's records after the shutdown (and the next lifespan of the same
+    process, e.g. in the tests) are still written."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
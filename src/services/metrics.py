@@ -0,0 +1,300 @@
+"""
+Метрики у форматі Prometheus: гістограми затримки та лічильники статусів по маршрутах,
+кількість запитів до БД та час БД на кожен HTTP-запит (події рушія SQLAlchemy).
+З кількома воркерами кожен періодично записує свій знімок у спільний каталог, а /metrics будь-якого
+воркера віддає їх суму.
+"""
+import asyncio
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+import logging
+import os
+import pathlib
+import time
+from typing import Any, Optional
+
+import orjson
+from sqlalchemy import event
+
+from src.database.db_connect import config
+
+
+logger = logging.getLogger(__name__)
+
+METRICS = config.getboolean('METRICS', 'enabled', fallback=True)
+# set by the launcher for several workers: the directory of the workers' snapshots, empty - one process
+MULTIPROCESS_DIR = config.get('METRICS', 'multiprocess_dir', fallback='')
+SNAPSHOT_INTERVAL = config.getfloat('METRICS', 'snapshot_interval', fallback=1)
+LATENCY_BUCKETS = tuple(
+                        float(bucket)
+                        for bucket in config.get('METRICS', 'latency_buckets', fallback='0.01,0.05,0.1,0.5,1,5').split(',')
+                        )
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) of the observed values."""
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, counts: list[int], sum_: float, count: int) -> None:
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+        self.sum += sum_
+        self.count += count
+
+    def samples(self, name: str, labels: str = '') -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels + "," if labels else ""}le="{bound}"}} {cumulative}')
+        labels = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{labels} {self.sum}')
+        lines.append(f'{name}_count{labels} {self.count}')
+        return lines
+
+
+@dataclass(slots=True)
+class RequestStats:
+    """DB work of one HTTP request, filled by the engine events."""
+    queries: int = 0
+    db_time: float = 0.0
+
+
+# stats of the request being served (None outside of requests: startup, background tasks)
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+
+class Metrics:
+    """Per route (path template, not the raw path - bounded label set) counters and histograms."""
+    def __init__(self, latency_buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.latency_buckets = latency_buckets
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_queries: dict[tuple[str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], float] = {}
+        # bcrypt pool of /api/auth (src.services.auth.HashExecutor): latency including the queue,
+        # rejections (503), running + queued hashes and the queued ones alone
+        self.hash_latency = Histogram(latency_buckets)
+        self.hash_rejected = 0
+        self.hash_in_flight = 0
+        self.hash_queue_depth = 0
+
+    def record(self, method: str, route: str, status: int, latency: float, stats: RequestStats) -> None:
+        key = (method, route)
+        self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(self.latency_buckets)
+            self.db_queries[key] = Histogram(QUERY_BUCKETS)
+            self.db_time[key] = 0.0
+        histogram.observe(latency)
+        self.db_queries[key].observe(stats.queries)
+        self.db_time[key] += stats.db_time
+
+    def snapshot(self) -> dict:
+        """The counters and histograms as JSON-ready lists (see merge)."""
+        return {
+                'requests': [[*key, count] for key, count in self.requests.items()],
+                'latency': [[*key, histogram.counts, histogram.sum, histogram.count] 
+                            for key, histogram in self.latency.items()],
+                'db_queries': [[*key, histogram.counts, histogram.sum, histogram.count] 
+                               for key, histogram in self.db_queries.items()],
+                'db_time': [[*key, seconds] for key, seconds in self.db_time.items()],
+                'hash': [self.hash_latency.counts, self.hash_latency.sum, self.hash_latency.count,
+                         self.hash_rejected, self.hash_in_flight, self.hash_queue_depth],
+                }
+
+    def merge(self, snapshot: dict) -> None:
+        """Add another process' snapshot to these metrics."""
+        for method, route, status, count in snapshot['requests']:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + count
+        for name, buckets in (('latency', self.latency_buckets), ('db_queries', QUERY_BUCKETS)):
+            histograms = getattr(self, name)
+            for method, route, counts, sum_, count in snapshot[name]:
+                histograms.setdefault((method, route), Histogram(buckets)).merge(counts, sum_, count)
+        for method, route, seconds in snapshot['db_time']:
+            self.db_time[(method, route)] = self.db_time.get((method, route), 0.0) + seconds
+        counts, sum_, count, rejected, in_flight, queue_depth = snapshot['hash']
+        self.hash_latency.merge(counts, sum_, count)
+        self.hash_rejected += rejected
+        self.hash_in_flight += in_flight  # gauges: the total of the workers
+        self.hash_queue_depth += queue_depth
+
+    def render(self) -> str:
+        """Text exposition format 0.0.4."""
+        lines = [
+                 '# HELP http_requests_total Requests by route and status.',
+                 '# TYPE http_requests_total counter',
+                 ]
+        for (method, route, status), count in self.requests.items():
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines += [
+                  '# HELP http_request_duration_seconds Request latency by route.',
+                  '# TYPE http_request_duration_seconds histogram',
+                  ]
+        for (method, route), histogram in self.latency.items():
+            lines += histogram.samples('http_request_duration_seconds', f'method="{method}",route="{route}"')
+
+        lines += [
+                  '# HELP db_queries_per_request Database queries per request by route.',
+                  '# TYPE db_queries_per_request histogram',
+                  ]
+        for (method, route), histogram in self.db_queries.items():
+            lines += histogram.samples('db_queries_per_request', f'method="{method}",route="{route}"')
+
+        lines += [
+                  '# HELP db_query_seconds_total Time spent in database queries by route.',
+                  '# TYPE db_query_seconds_total counter',
+                  ]
+        for (method, route), seconds in self.db_time.items():
+            lines.append(f'db_query_seconds_total{{method="{method}",route="{route}"}} {seconds}')
+
+        lines += [
+                  '# HELP auth_hash_seconds Password hash latency including the wait in the bcrypt pool queue.',
+                  '# TYPE auth_hash_seconds histogram',
+                  *self.hash_latency.samples('auth_hash_seconds'),
+                  '# HELP auth_hash_rejected_total Hash requests rejected with 503 (full bcrypt pool queue).',
+                  '# TYPE auth_hash_rejected_total counter',
+                  f'auth_hash_rejected_total {self.hash_rejected}',
+                  '# HELP auth_hash_in_flight Hashes running or queued in the bcrypt pool.',
+                  '# TYPE auth_hash_in_flight gauge',
+                  f'auth_hash_in_flight {self.hash_in_flight}',
+                  '# HELP auth_hash_queue_depth Hashes waiting for a bcrypt pool thread.',
+                  '# TYPE auth_hash_queue_depth gauge',
+                  f'auth_hash_queue_depth {self.hash_queue_depth}',
+                  ]
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class Snapshots:
+    """Metrics of several worker processes: each one rewrites <directory>/<pid>.json every interval 
+    (and on shutdown); a scrape sums the files of the others with its own live metrics. The files of 
+    the exited (recycled) workers stay, so the counters never go back."""
+    def __init__(self, directory: str = MULTIPROCESS_DIR, interval: float = SNAPSHOT_INTERVAL) -> None:
+        self.directory = pathlib.Path(directory) if directory else None
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def path(self) -> pathlib.Path:
+        return self.directory / f'{os.getpid()}.json'
+
+    def write(self) -> None:
+        """Replace this worker's file atomically (a reader never sees a half written one)."""
+        path = self.path()
+        temporary = path.with_suffix('.tmp')
+        temporary.write_bytes(orjson.dumps(metrics.snapshot()))
+        os.replace(temporary, path)
+
+    def collect(self) -> Metrics:
+        """The metrics of all the workers."""
+        total = Metrics()
+        own = self.path()
+        for path in self.directory.glob('*.json'):
+            if path != own:
+                try:
+                    total.merge(orjson.loads(path.read_bytes()))
+                except (OSError, ValueError, KeyError) as error:
+                    logger.warning(f'Metrics snapshot {path} is skipped: {error}')
+        total.merge(metrics.snapshot())
+        return total
+
+    def render(self) -> str:
+        return (self.collect() if self.directory else metrics).render()
+
+    async def write_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
+
+    def start(self) -> None:
+        if self.directory and self._task is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.write()
+            self._task = asyncio.get_running_loop().create_task(self.write_periodically())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.write()
+
+
+snapshots = Snapshots()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead): times the request,
+    takes the status from the response start and the route template from the matched route."""
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status = 500
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            request_stats.reset(token)
+            route = scope.get('route')
+            metrics.record(
+                           scope['method'],
+                           getattr(route, 'path', 'unmatched'),
+                           status,
+                           time.perf_counter() - start,
+                           stats
+                           )
+
+
+def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    start = conn.info['query_start'].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def handle_error(exception_context: Any) -> None:
+    """A failed query never reaches after_cursor_execute - drop its start time."""
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
+
+
+def instrument_engine(engine: Any) -> None:
+    """Count the queries and DB time of the current request (sync or async engine)."""
+    engine = getattr(engine, 'sync_engine', engine)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', handle_error)
@@ -0,0 +1,53 @@
+"""
+In-process n-gram (trigram) index контактів - заміна pg_trgm для sqlite (тестові/локальні налаштування).
+"""
+from typing import Iterable, Optional
+
+from src.database.db_connect import config
+from src.services.cache import TTLCache
+
+
+N = 3
+
+
+def ngrams(value: str) -> set[str]:
+    """All lowercase n-grams of the value (empty for values shorter than N)."""
+    value = value.lower()
+    return {value[i:i + N] for i in range(len(value) - N + 1)}
+
+
+class NgramIndex:
+    """Postings field -> n-gram -> contact ids of one user's address book."""
+    def __init__(self, fields: Iterable[str]) -> None:
+        self.postings: dict[str, dict[str, set[int]]] = {field: {} for field in fields}
+
+    def add(self, contact_id: int, values: dict) -> None:
+        for field, postings in self.postings.items():
+            for gram in ngrams(str(values[field] or '')):
+                postings.setdefault(gram, set()).add(contact_id)
+
+    def candidates(self, field: str, query: str) -> Optional[set[int]]:
+        """Ids whose field may contain the query, None if the query is too short to prune anything."""
+        grams = ngrams(query)
+        if not grams:
+            return None
+
+        postings = self.postings[field]
+        result = None
+        for gram in grams:
+            ids = postings.get(gram, set())
+            result = ids.copy() if result is None else result & ids
+            if not result:
+                break
+
+        return result
+
+
+# user id -> NgramIndex; dropped on every write to the user's contacts and rebuilt on the next search.
+# Per process: another process's writes are seen only after the ttl, so it is off by default and with several workers
+ngram_indexes = TTLCache(
+                         maxsize=config.getint('SEARCH', 'ngram_index_users', fallback=128),
+                         ttl=config.getfloat('SEARCH', 'ngram_index_ttl', fallback=600)
+                         )
+NGRAM_INDEX = config.getboolean('SEARCH', 'ngram_index', fallback=False)
+NGRAM_MAX_CANDIDATES = config.getint('SEARCH', 'ngram_max_candidates', fallback=1000)
@@ -0,0 +1,121 @@
+"""
+Журнал повільних запитів до БД (замість echo=True): лише запити, довші за поріг, з відбитками
+параметрів замість їх значень та, для частини запитів (вибірка), планом виконання EXPLAIN.
+"""
+import hashlib
+import logging
+import random
+import re
+import time
+from typing import Any
+
+from sqlalchemy import event
+
+from src.database.db_connect import config
+
+
+SLOW_QUERY_MS = config.getfloat('SLOW_QUERY', 'threshold_ms', fallback=200)  # 0 - off
+EXPLAIN_SAMPLE = config.getfloat('SLOW_QUERY', 'explain_sample', fallback=0.0)  # fraction of the slow SELECTs
+MAX_STATEMENT = 2000
+
+# EXPLAIN ANALYZE runs the statement once more, so only SELECTs and inside a savepoint (a failure would abort
+# the transaction of the request otherwise); sqlite has no ANALYZE - only the query plan
+EXPLAIN = {
+    'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+PLACEHOLDERS = re.compile(r'(\$\d+|%\(\w+\)s|\?)(\s*,\s*(\$\d+|%\(\w+\)s|\?))+')
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(value: Any) -> str:
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:8]
+
+
+def statement_fingerprint(statement: str) -> str:
+    """Same for the same query shape: expanded IN (...) lists of any length are collapsed."""
+    return fingerprint(PLACEHOLDERS.sub('...', ' '.join(statement.split())))
+
+
+def parameters_fingerprint(parameters: Any, executemany: bool) -> Any:
+    """Type and hash of every bound parameter - correlates the repeated slow calls without logging the values."""
+    if executemany:
+        return {'rows': len(parameters)}
+
+    if isinstance(parameters, dict):
+        return {name: f'{type(value).__name__}:{fingerprint(value)}' for name, value in parameters.items()}
+
+    return [f'{type(value).__name__}:{fingerprint(value)}' for value in parameters or ()]
+
+
+def explain(conn: Any, statement: str, parameters: Any) -> Any:
+    """The plan of the statement, None if it could not be captured."""
+    prefix = EXPLAIN.get(conn.dialect.name)
+    if prefix is None:
+        return None
+
+    conn.info['explaining'] = True
+    try:
+        conn.exec_driver_sql('SAVEPOINT slow_query_explain')
+        try:
+            plan = [' '.join(map(str, row)) for row in conn.exec_driver_sql(prefix + statement, parameters)]
+            conn.exec_driver_sql('RELEASE SAVEPOINT slow_query_explain')
+            return plan
+
+        except Exception:
+            conn.exec_driver_sql('ROLLBACK TO SAVEPOINT slow_query_explain')
+            raise
+
+    except Exception as error:
+        logger.debug(f'EXPLAIN failed: {error}')
+        return None
+
+    finally:
+        conn.info['explaining'] = False
+
+
+def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if context is not None:
+        context.slow_query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    start = getattr(context, 'slow_query_start', None)
+    if start is None or conn.info.get('explaining'):
+        return
+
+    duration = (time.perf_counter() - start) * 1000
+    if duration < SLOW_QUERY_MS:
+        return
+
+    plan = None
+    if (
+        EXPLAIN_SAMPLE
+        and not executemany
+        and statement.lstrip().upper().startswith('SELECT')
+        and not context.execution_options.get('stream_results')  # a server-side cursor is still open
+        and random.random() < EXPLAIN_SAMPLE
+        ):
+        plan = explain(conn, statement, parameters)
+
+    record = {
+              'duration_ms': round(duration, 1),
+              'fingerprint': statement_fingerprint(statement),
+              'parameters': parameters_fingerprint(parameters, executemany),
+              'statement': statement[:MAX_STATEMENT],
+              'plan': plan,
+              }
+    logger.warning(f'slow query {record["duration_ms"]} ms [{record["fingerprint"]}]: {record["statement"]} '
+                   f'parameters={record["parameters"]}' + ('\n' + '\n'.join(plan) if plan else ''),
+                   extra={'slow_query': record})
+
+
+def instrument_engine(engine: Any) -> None:
+    """Log the slow statements of the engine (sync or async one)."""
+    if SLOW_QUERY_MS <= 0:
+        return
+
+    engine = getattr(engine, 'sync_engine', engine)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
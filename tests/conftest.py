@@ -0,0 +1,64 @@
+"""
+Спільні фікстури тестів: база (create_all), застосунок (TestClient) та користувачі з токенами.
+
+За замовчуванням - тимчасовий sqlite файл. TEST_POSTGRESQL_DB=<назва> - PostgreSQL сервер з config.ini
+(DB_DEV_*, можна перевизначити змінними оточення) з цією базою: її таблиці видаляються та створюються заново,
+тож лише окрема тестова база, потрібне розширення pg_trgm.
+"""
+import os
+import tempfile
+
+if os.environ.get('TEST_POSTGRESQL_DB'):
+    os.environ['DB_DEV_SQLITE_FILE'] = ''
+    os.environ['DB_DEV_DB_NAME'] = os.environ['TEST_POSTGRESQL_DB']
+else:
+    os.environ['DB_DEV_SQLITE_FILE'] = os.path.join(tempfile.mkdtemp(prefix='tests'), 'test.db')
+
+from itertools import count
+from typing import Callable, Iterator
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine, Engine, text
+
+from main import app
+from src.database.db_connect import Base, database_url
+
+
+@pytest.fixture(scope='session')
+def engine() -> Iterator[Engine]:
+    """Sync engine on the empty test database (the app opens its own one in the lifespan)."""
+    engine = create_engine(database_url())
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as connection:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def client(engine: Engine) -> Iterator[TestClient]:
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope='session')
+def new_user(client: TestClient) -> Callable[[], tuple[int, dict]]:
+    """Sign up and log in a new user, return their id and the Authorization header of the access token."""
+    numbers = count()
+
+    def new_user() -> tuple[int, dict]:
+        email = f'user{next(numbers)}@example.com'
+        response = client.post('/api/auth/signup', json={'username': 'user', 'email': email, 'password': 'secret1'})
+        assert response.status_code == 201, response.text
+        user_id = response.json()['user']['id']
+        response = client.post('/api/auth/login', data={'username': email, 'password': 'secret1'})
+        assert response.status_code == 200, response.text
+
+        return user_id, {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    return new_user
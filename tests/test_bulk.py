@@ -0,0 +1,46 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+from fastapi.testclient import TestClient
+import pytest
+
+from src.services.bulk import iter_lines, MAX_LINE_LENGTH
+
+
+async def stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def lines(*chunks: bytes, max_length: int = 5) -> list:
+    async def read() -> list:
+        return [line async for line in iter_lines(stream(*chunks), max_length)]
+
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize('chunks, expected', [
+    ((b'ab\ncd\n',), ['ab', 'cd']),
+    ((b'a', b'b\nc', b'd'), ['ab', 'cd']),
+    ((b'abcdef\nok\n',), [None, 'ok']),
+    ((b'abc', b'def', b'ghi', b'\nok'), [None, 'ok']),
+    ((b'abcdefghij' * 10,), [None]),
+    ((b'ok\n', b'abcdefgh', b'ij\nxy', b'z'), ['ok', None, 'xyz']),
+    ((b'\xc3', b'\xa9\n'), ['é']),  # a split utf-8 character waits for its second byte
+])
+def test_iter_lines(chunks: tuple[bytes, ...], expected: list) -> None:
+    assert lines(*chunks) == expected
+
+
+def test_too_long_line_is_an_invalid_row(client: TestClient, new_user) -> None:
+    _, headers = new_user()
+    contact = {'name': 'Bulk', 'last_name': 'Row', 'email': 'bulk@example.com', 'phone': 1234, 'birthday': '1990-01-01'}
+    body = b'x' * (MAX_LINE_LENGTH * 3) + b'\n' + json.dumps(contact).encode() + b'\n'
+
+    response = client.post('/api/contacts/bulk', headers={**headers, 'Content-Type': 'application/x-ndjson'},
+                           content=body)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report['inserted'], report['invalid']) == (1, 1)
+    assert report['errors'] == [{'row': 1, 'detail': f'Line longer than {MAX_LINE_LENGTH} characters'}]
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import pathlib
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import orjson
+import pytest
+
+from src.services import auth as auth_module, metrics as metrics_module
+from src.services.auth import HashExecutor
+from src.services.metrics import Metrics, RequestStats, Snapshots
+
+
+def worker_metrics(requests: int) -> Metrics:
+    worker = Metrics()
+    for _ in range(requests):
+        worker.record('GET', '/api/contacts/', 200, 0.02, RequestStats(queries=2, db_time=0.01))
+    return worker
+
+
+def test_scrape_sums_the_workers(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / '1.json').write_bytes(orjson.dumps(worker_metrics(3).snapshot()))
+    (tmp_path / '2.json').write_bytes(orjson.dumps(worker_metrics(4).snapshot()))
+    (tmp_path / f'{os.getpid()}.json').write_bytes(orjson.dumps(worker_metrics(100).snapshot()))  # stale own file
+    (tmp_path / '3.json').write_bytes(b'{broken')
+    monkeypatch.setattr(metrics_module, 'metrics', worker_metrics(5))
+
+    text = Snapshots(str(tmp_path)).render()
+
+    assert 'http_requests_total{method="GET",route="/api/contacts/",status="200"} 12' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/contacts/"} 12' in text
+    assert 'db_queries_per_request_bucket{method="GET",route="/api/contacts/",le="2"} 12' in text
+
+
+def test_snapshot_round_trip(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics_module, 'metrics', worker_metrics(2))
+    snapshots = Snapshots(str(tmp_path))
+    snapshots.write()
+
+    total = Metrics()
+    total.merge(orjson.loads(snapshots.path().read_bytes()))
+    assert total.render() == worker_metrics(2).render()
+
+
+def test_hash_pool_is_exported(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics_module, 'metrics', Metrics())
+    monkeypatch.setattr(auth_module, 'metrics', metrics_module.metrics)
+    executor = HashExecutor(workers=1, queue_limit=0)
+
+    async def hash_twice() -> None:
+        assert await executor.run(lambda: 'hashed') == 'hashed'
+        executor.in_flight = 1  # a full pool
+        with pytest.raises(HTTPException) as error:
+            await executor.run(lambda: 'hashed')
+        assert error.value.status_code == 503
+
+    asyncio.run(hash_twice())
+    text = client.get('/metrics').text
+    assert 'auth_hash_seconds_count 1' in text
+    assert 'auth_hash_rejected_total 1' in text
+    assert 'auth_hash_queue_depth 0' in text
+    assert client.get('/api/auth/hash_metrics').status_code == 404
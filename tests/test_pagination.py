@@ -0,0 +1,59 @@
+from base64 import b64encode
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg2
+
+from src.database.models import Contact
+from src.database.pagination import cursor_place, Explain
+from src.repository.contacts import contains_any
+
+
+def test_explain_sends_user_input_as_parameters():
+    query = select(Contact.id).filter(Contact.user_id == 1, contains_any("foo :bar's"))
+    for dialect in (psycopg2.dialect(), asyncpg.dialect()):
+        compiled = Explain(query).compile(dialect=dialect)
+
+        assert str(compiled).startswith('EXPLAIN (FORMAT JSON) SELECT contacts.id')
+        assert 'foo' not in str(compiled)
+        assert "%foo :bar's%" in compiled.params.values()
+        assert compiled._result_columns == []
+
+
+def cursor(value: str) -> str:
+    return b64encode(value.encode()).decode()
+
+
+@pytest.mark.parametrize('place', ['["Name", 1]', '[null, 1]', '["", 0]'])
+def test_cursor_place_fits_the_order_columns(place: str) -> None:
+    assert len(cursor_place(place, (Contact.name, Contact.id))) == 2
+
+
+@pytest.mark.parametrize('place', ['[1, "x"]', '["Name", "1"]', '["Name", true]', '["Name", 1.5]', 
+                                   '["Name"]', '{"name": "Name", "id": 1}', '["Name", [1]]'])
+def test_cursor_place_rejects_other_values(place: str) -> None:
+    with pytest.raises(ValueError):
+        cursor_place(place, (Contact.name, Contact.id))
+
+
+@pytest.mark.parametrize('token', ['!!!', 'abc', cursor('[1, "x"]'), cursor('not json'), '%2F%2F4%3D'])
+def test_invalid_cursor_is_400(client: TestClient, new_user, token: str) -> None:
+    _, headers = new_user()
+    response = client.get('/api/contacts/cursor/', headers=headers, params={'cursor': token})
+    assert response.status_code == 400, response.text
+    assert response.json()['detail'] == 'Invalid cursor'
+
+
+def test_next_page_cursor_is_accepted(client: TestClient, new_user) -> None:
+    _, headers = new_user()
+    for number in range(3):
+        response = client.post('/api/contacts/', headers=headers, 
+                               json={'name': f'Page{number}', 'email': f'p{number}@example.com', 'phone': 6660000 + number, 
+                                     'birthday': '1990-05-17'})
+        assert response.status_code == 201, response.text
+
+    first = client.get('/api/contacts/cursor/', headers=headers, params={'size': 2}).json()
+    second = client.get('/api/contacts/cursor/', headers=headers, params={'size': 2, 'cursor': first['next_page']})
+    assert second.status_code == 200, second.text
+    assert [item['name'] for item in second.json()['items']] == ['Page2']
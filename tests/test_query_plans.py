@@ -0,0 +1,144 @@
+"""
+Регресія використання індексів: кожен запит до contacts (SELECT, а також DELETE/UPDATE масових змін з їх
+підзапитом selected_ids), виконаний ендпоінтом, одразу проходить EXPLAIN (src.services.slow_query.explain,
+без ANALYZE - зміни не виконуються вдруге) на засіяній базі; послідовний перегляд таблиці - помилка.
+"""
+from datetime import date, timedelta
+import re
+from typing import Any, Iterator
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import Engine, event, insert, select, text
+
+from src.database import db_connect
+from src.database.models import Contact, User
+from src.repository.contacts import derived_values
+from src.services import slow_query
+
+
+USERS = 20
+CONTACTS_PER_USER = 500
+# PostgreSQL EXPLAIN and sqlite EXPLAIN QUERY PLAN wording of a full table scan
+SEQUENTIAL_SCAN = re.compile(r'Seq Scan on contacts\b|\bSCAN contacts\b')
+STATEMENTS = re.compile(r'\s*(SELECT\b.*\bcontacts\b|DELETE FROM contacts\b|UPDATE contacts\b)', re.IGNORECASE | re.DOTALL)
+
+
+def contact_values(user_id: int, number: int) -> dict:
+    return derived_values({
+                           'name': f'Name{number:05d}',
+                           'last_name': f'Last{number % 97:02d}',
+                           'email': f'u{user_id}c{number}@example.com',
+                           'phone': 5000000000 + user_id * 100000 + number,
+                           'birthday': date(1990, 1, 1) + timedelta(days=number * 7),
+                           'description': '-',
+                           'user_id': user_id,
+                           })
+
+
+@pytest.fixture(scope='module')
+def seeded(engine: Engine, new_user: Any) -> dict:
+    """The test user among USERS users with CONTACTS_PER_USER contacts each, statistics gathered."""
+    user_id, headers = new_user()
+    with engine.begin() as connection:
+        others = [
+                  connection.execute(
+                                     insert(User)
+                                     .values(username='other', email=f'other{number}@example.com', password='-')
+                                     .returning(User.id)
+                                     ).scalar()
+                  for number in range(USERS - 1)
+                  ]
+        connection.execute(
+                           insert(Contact),
+                           [contact_values(owner, number) for owner in (user_id, *others) for number in range(CONTACTS_PER_USER)]
+                           )
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text('VACUUM ANALYZE contacts' if engine.dialect.name == 'postgresql' else 'ANALYZE'))
+
+    with engine.connect() as connection:
+        contact = connection.execute(
+                                     select(Contact.id, Contact.email, Contact.phone, Contact.name)
+                                     .filter(Contact.user_id == user_id)
+                                     .order_by(Contact.id)
+                                     .offset(CONTACTS_PER_USER // 2)
+                                     ).first()
+
+    return {'headers': headers, 'contact': contact._asdict()}
+
+
+@pytest.fixture
+def plans(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> Iterator[list[tuple[str, list[str]]]]:
+    """(statement, plan) of every statement on contacts run by the app meanwhile."""
+    captured = []
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if STATEMENTS.match(statement) and not conn.info.get('explaining'):
+            captured.append((statement, slow_query.explain(conn, statement, parameters)))
+
+    # the plan only (EXPLAIN ANALYZE would run the DELETE/UPDATE once more), taken before the statement runs:
+    # sqlite can not EXPLAIN while the rows of a DELETE/UPDATE ... RETURNING are still to be fetched
+    monkeypatch.setitem(slow_query.EXPLAIN, 'postgresql', 'EXPLAIN ')
+    engine = getattr(db_connect.engine, 'sync_engine', db_connect.engine)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield captured
+
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def assert_index_used(plans: list[tuple[str, list[str]]]) -> None:
+    assert plans, 'no query on contacts was run'
+    for statement, plan in plans:
+        assert plan is not None, f'EXPLAIN failed: {statement}'
+        scans = [line for line in plan if SEQUENTIAL_SCAN.search(line)]
+        assert not scans, f'sequential scan of contacts:\n{statement}\n' + '\n'.join(plan)
+
+
+# name: contact -> (method, url, query parameters, JSON body); the bulk changes touch the Name0048x/Name0049x
+# contacts only (the picked contact is Name00250)
+REQUESTS = {
+    'get_contacts': lambda contact: ('GET', '/api/contacts/', {'count': 'exact', 'size': 20}, None),
+    'get_contacts_deep_page': lambda contact: ('GET', '/api/contacts/', {'count': 'skip', 'page': 10, 'size': 20}, None),
+    'keyset_first_page': lambda contact: ('GET', '/api/contacts/cursor/', {'size': 20}, None),
+    'get_contact': lambda contact: ('GET', f'/api/contacts/{contact["id"]}', {}, None),
+    'lookup_by_email': lambda contact: ('GET', '/api/contacts/search_by_fields_and/', {'email': contact['email']}, None),
+    'lookup_by_phone': lambda contact: ('GET', '/api/contacts/search_by_fields_and/', {'phone': contact['phone']}, None),
+    'multi_get': lambda contact: ('GET', '/api/contacts/batch',
+                                  {'ids': f'{contact["id"]},{contact["id"] + 1},{contact["id"] + 2}'}, None),
+    'search_by_fields_or': lambda contact: ('GET', f'/api/contacts/search_by_fields_or/{contact["name"]}', {}, None),
+    'search_by_like_fields_or': lambda contact: ('GET', '/api/contacts/search_by_like_fields_or/ame0025', {}, None),
+    'search_by_like_fields_or_phone': lambda contact: ('GET', f'/api/contacts/search_by_like_fields_or/'
+                                                              f'{str(contact["phone"])[-6:]}', {}, None),
+    'search_by_like_fields_and': lambda contact: ('GET', '/api/contacts/search_by_like_fields_and/',
+                                                  {'name': 'ame0025', 'last_name': 'ast'}, None),
+    'search_by_similarity': lambda contact: ('GET', '/api/contacts/search_by_similarity/ame0025', {}, None),
+    'birthdays': lambda contact: ('GET', '/api/contacts/search_by_birthday_celebration_within_days/30', {}, None),
+    'export': lambda contact: ('GET', '/api/contacts/export', {}, None),
+    'bulk_patch_by_filter': lambda contact: ('PATCH', '/api/contacts/', {},
+                                             {'filter': {'like': 'Name0048'}, 'values': {'description': 'bulk'}}),
+    'bulk_delete_by_filter': lambda contact: ('DELETE', '/api/contacts/', {}, {'filter': {'like': 'Name0049'}}),
+    'bulk_delete_by_ids': lambda contact: ('DELETE', '/api/contacts/', {}, {'ids': [contact['id'] + 100]}),
+}
+
+
+@pytest.mark.parametrize('name', REQUESTS)
+def test_repository_query_uses_an_index(name: str, seeded: dict, client: TestClient, plans: list) -> None:
+    method, url, params, body = REQUESTS[name](seeded['contact'])
+    response = client.request(method, url, params=params, json=body, headers=seeded['headers'])
+    assert response.status_code == 200, response.text
+
+    if method != 'GET':  # the bulk change itself, with its selected_ids subquery
+        verb = {'PATCH': 'UPDATE', 'DELETE': 'DELETE'}[method]
+        assert any(statement.lstrip().upper().startswith(verb) for statement, _ in plans), f'no {verb} captured'
+    assert_index_used(plans)
+
+
+def test_keyset_next_page_uses_an_index(seeded: dict, client: TestClient, plans: list) -> None:
+    first = client.get('/api/contacts/cursor/', params={'size': 20}, headers=seeded['headers']).json()
+    plans.clear()
+    response = client.get('/api/contacts/cursor/', params={'size': 20, 'cursor': first['next_page']},
+                          headers=seeded['headers'])
+    assert response.status_code == 200, response.text
+    assert [item['name'] for item in response.json()['items']][0] > first['items'][-1]['name']
+
+    assert_index_used(plans)
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+import pytest
+
+from src.database.db_connect import replicas, ReplicaSet
+from src.routes.contacts import WRITE_MARK_COOKIE, WRITE_MARK_HEADER
+
+
+def replica_set(secret_key: str = 'key', read_your_writes: float = 5) -> ReplicaSet:
+    """A worker's ReplicaSet with one healthy replica."""
+    replica_set = ReplicaSet()
+    replica_set.replicas = [SimpleNamespace(healthy=True)]
+    replica_set.secret_key = secret_key.encode()
+    replica_set.read_your_writes = read_your_writes
+    return replica_set
+
+
+def test_write_mark_holds_in_another_worker() -> None:
+    writer, reader = replica_set(), replica_set()
+    mark = writer.write_mark(1)
+
+    assert reader.choose(1, mark) is None
+    assert reader.choose(1) is reader.replicas[0]
+    assert reader.choose(2, mark) is reader.replicas[0]
+
+
+@pytest.mark.parametrize('mark', ['', 'garbage', '99999999999999.00', '1.' + '0' * 64])
+def test_forged_write_mark_is_ignored(mark: str) -> None:
+    reader = replica_set()
+    assert reader.choose(1, mark) is reader.replicas[0]
+
+
+def test_write_mark_of_another_key_or_expired_is_ignored() -> None:
+    assert replica_set().choose(1, replica_set('other').write_mark(1)) is not None
+    assert replica_set().choose(1, replica_set(read_your_writes=-1).write_mark(1)) is not None
+
+
+def test_writes_give_the_client_the_mark(client: TestClient, new_user, monkeypatch: pytest.MonkeyPatch) -> None:
+    user_id, headers = new_user()
+    response = client.post('/api/contacts/', headers=headers, json={'email': 'a@example.com', 'birthday': '1990-05-17'})
+    assert response.status_code == 201, response.text
+    assert WRITE_MARK_HEADER not in response.headers
+
+    monkeypatch.setattr(replicas, 'replicas', [SimpleNamespace(healthy=False)])
+    response = client.patch(f'/api/contacts/{response.json()["id"]}', headers=headers, json={'name': 'Marked'})
+    assert response.status_code == 200, response.text
+    mark = response.headers[WRITE_MARK_HEADER]
+    assert response.cookies[WRITE_MARK_COOKIE] == mark
+    client.cookies.clear()
+    assert replica_set(replicas.secret_key.decode()).choose(user_id, mark) is None
+
+
+def test_reads_with_the_mark_go_to_the_primary(client: TestClient, new_user, monkeypatch: pytest.MonkeyPatch) -> None:
+    def replica_session() -> None:
+        raise AssertionError('read from the replica')
+
+    user_id, headers = new_user()
+    monkeypatch.setattr(replicas, 'replicas', [SimpleNamespace(healthy=True, session=replica_session)])
+    mark = replicas.write_mark(user_id)
+
+    response = client.get('/api/contacts/', headers={**headers, WRITE_MARK_HEADER: mark})
+    assert response.status_code == 200, response.text
+    client.cookies.set(WRITE_MARK_COOKIE, mark)
+    try:
+        assert client.get('/api/contacts/', headers=headers).status_code == 200
+    finally:
+        client.cookies.clear()
+    with pytest.raises(AssertionError, match='replica'):
+        client.get('/api/contacts/', headers=headers)
@@ -0,0 +1,100 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import Engine, insert
+
+from src.database.models import Contact
+from src.repository.contacts import derived_values, phone_query
+
+
+def add_contacts(client: TestClient, headers: dict, *contacts: tuple[str, str, int]) -> dict[str, int]:
+    """Create the (name, last_name, phone) contacts, return their ids by name."""
+    ids = {}
+    for number, (name, last_name, phone) in enumerate(contacts):
+        response = client.post('/api/contacts/', headers=headers, json={
+                                                                        'name': name,
+                                                                        'last_name': last_name,
+                                                                        'email': f'c{number}@example.com',
+                                                                        'phone': phone,
+                                                                        'birthday': '1990-05-17',
+                                                                        })
+        assert response.status_code == 201, response.text
+        ids[name] = response.json()['id']
+
+    return ids
+
+
+def found(client: TestClient, headers: dict, url: str) -> set[str]:
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return {item['name'] for item in response.json()['items']}
+
+
+@pytest.mark.parametrize('query, digits', [
+    ('555', '555'),
+    ('+38 (050) 555-12-34', '380505551234'),
+    ('john5', None),
+    ('Smith2', None),
+    ('smith', None),
+    ('+-()', None),
+])
+def test_phone_query(query: str, digits: str | None) -> None:
+    assert phone_query(query) == digits
+
+
+def test_text_with_digits_does_not_match_phones(client: TestClient, new_user) -> None:
+    _, headers = new_user()
+    add_contacts(client, headers, ('John', 'Doe', 5551234), ('Agent', 'Smith', 1), ('Mary', 'Smith', 7770000))
+
+    assert found(client, headers, '/api/contacts/search_by_like_fields_or/john5') == set()
+    assert found(client, headers, '/api/contacts/search_by_like_fields_or/agent1') == set()
+    assert found(client, headers, '/api/contacts/search_by_fields_or/1') == {'Agent'}
+    assert found(client, headers, '/api/contacts/search_by_fields_or/agent1') == set()
+
+
+def test_phone_shaped_query_matches_phones(client: TestClient, new_user) -> None:
+    _, headers = new_user()
+    add_contacts(client, headers, ('John', 'Doe', 5551234), ('Mary', 'Smith', 7770000))
+
+    assert found(client, headers, '/api/contacts/search_by_like_fields_or/555-12') == {'John'}
+    assert found(client, headers, '/api/contacts/search_by_like_fields_or/ 555 1234') == {'John'}
+    assert found(client, headers, '/api/contacts/search_by_fields_or/555-1234') == {'John'}
+
+
+def test_bulk_like_filter_does_not_match_phones(client: TestClient, new_user) -> None:
+    _, headers = new_user()
+    ids = add_contacts(client, headers, ('Smith2', 'Doe', 3330000), ('Mary', 'Smith', 2222222))
+
+    response = client.request('DELETE', '/api/contacts/', headers=headers, json={'filter': {'like': 'Smith2'}})
+    assert response.status_code == 200, response.text
+    assert response.json()['ids'] == [ids['Smith2']]
+    assert found(client, headers, '/api/contacts/search_by_like_fields_or/Mary') == {'Mary'}
+
+
+def test_text_query_does_not_match_contacts_without_phone(client: TestClient, engine: Engine, new_user) -> None:
+    user_id, headers = new_user()
+    with engine.begin() as connection:
+        connection.execute(insert(Contact).values(derived_values({
+                                                                   'name': 'Nophone',
+                                                                   'last_name': 'Doe',
+                                                                   'email': 'nophone@example.com',
+                                                                   'phone': None,
+                                                                   'birthday': date(1990, 5, 17),
+                                                                   'description': '-',
+                                                                   'user_id': user_id,
+                                                                   })))
+
+    assert found(client, headers, '/api/contacts/search_by_fields_or/smith') == set()
+    assert found(client, headers, '/api/contacts/search_by_like_fields_or/smith') == set()
+
+
+def test_searches_count_exactly_by_default(client: TestClient, new_user) -> None:
+    _, headers = new_user()
+    add_contacts(client, headers, *((f'Exact{number}', 'Doe', 4440000 + number) for number in range(3)))
+
+    for url in ('/api/contacts/search_by_like_fields_or/exact', '/api/contacts/search_by_similarity/exact',
+                '/api/contacts/search_by_like_fields_and/?name=exact', '/api/contacts/'):
+        response = client.get(url, headers=headers, params={'size': 2})
+        assert response.status_code == 200, response.text
+        assert (response.json()['total'], response.json()['pages']) == (3, 2), url